@@ -0,0 +1,161 @@
+"""Terra Incognita arXiv client plumbing.
+
+arXiv asks API users to stay at or below one request every 3 seconds for the
+whole process, not per connection. TokenBucket enforces that budget across
+threads, and make_client() returns an arxiv.Client whose page requests draw
+from a shared bucket instead of each client sleeping on its own.
+
+ResponseCache optionally stores raw API responses on disk so repeated
+backtests replay from local files instead of re-fetching at 3 s per page.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+import arxiv
+import requests
+
+RATE_LIMIT_SECONDS = 3
+RATE_LIMIT_BURST = 1
+
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: float = RATE_LIMIT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _RateLimitedSession:
+    """Wraps the client's requests.Session so every GET takes a token first."""
+
+    def __init__(self, session, limiter: TokenBucket):
+        self._session = session
+        self._limiter = limiter
+
+    def get(self, url, **kwargs):
+        self._limiter.acquire()
+        return self._session.get(url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of arXiv API responses.
+
+    Entries are keyed by the SHA-256 of the request URL, which encodes the
+    query (including any submittedDate window), the start offset and the page
+    size. Entries older than ttl seconds are refetched; ttl=None never
+    expires, which suits closed historical windows whose results can't change.
+    """
+
+    def __init__(self, directory: str | Path, ttl: float | None = None):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / key[:2] / f"{key}.xml"
+
+    def get(self, url: str) -> bytes | None:
+        path = self._path(url)
+        try:
+            if self.ttl is not None and time.time() - path.stat().st_mtime > self.ttl:
+                content = None
+            else:
+                content = path.read_bytes()
+        except FileNotFoundError:
+            content = None
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def put(self, url: str, content: bytes) -> None:
+        path = self._path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+
+
+class _CachingSession:
+    """Serves GETs from a ResponseCache, falling through to the wrapped session."""
+
+    def __init__(self, session, cache: ResponseCache):
+        self._session = session
+        self._cache = cache
+
+    def get(self, url, **kwargs):
+        content = self._cache.get(url)
+        if content is not None:
+            resp = requests.Response()
+            resp.status_code = 200
+            resp.url = url
+            resp._content = content
+            return resp
+
+        resp = self._session.get(url, **kwargs)
+        # Empty pages are often transient on arXiv's side; don't pin them.
+        if resp.status_code == 200 and b"<entry>" in resp.content:
+            self._cache.put(url, resp.content)
+        return resp
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def make_client(
+    limiter: TokenBucket | None = None,
+    cache: ResponseCache | None = None,
+    page_size: int = 100,
+    num_retries: int = 5,
+) -> arxiv.Client:
+    """Create an arxiv.Client, optionally paced by a shared limiter.
+
+    Without a limiter or cache the client keeps the library's own per-client
+    delay. Otherwise the built-in delay is disabled and every page request
+    that reaches arXiv (including retries) waits on the bucket instead, so
+    cache hits are served without any delay.
+    """
+    if limiter is None and cache is None:
+        return arxiv.Client(
+            page_size=page_size,
+            delay_seconds=RATE_LIMIT_SECONDS,
+            num_retries=num_retries,
+        )
+
+    if limiter is None:
+        limiter = TokenBucket(rate=1 / RATE_LIMIT_SECONDS)
+    client = arxiv.Client(page_size=page_size, delay_seconds=0, num_retries=num_retries)
+    session = _RateLimitedSession(client._session, limiter)
+    if cache is not None:
+        session = _CachingSession(session, cache)
+    client._session = session
+    return client
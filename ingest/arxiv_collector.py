@@ -6,18 +6,38 @@ Collects papers (12 domains × 1,000) and bulk indexes to Elasticsearch.
 Usage:
   python3 arxiv_collector.py                    # Recent papers (default)
   python3 arxiv_collector.py --before 2020      # Papers before 2020 (backtest)
+  python3 arxiv_collector.py --workers 4        # Collect domains concurrently
+  python3 arxiv_collector.py --incremental      # Only papers newer than the last run
+  python3 arxiv_collector.py --before 2020 --cache  # Replay arXiv responses from disk
+  python3 arxiv_collector.py --from-ndjson papers.ndjson papers_before_2020.ndjson \
+      --bulk-concurrency 4                      # Reindex local archives, no arXiv calls
+  python3 arxiv_collector.py --archive          # Also append to the segmented archive
+  python3 arxiv_collector.py --from-archive archive/papers  # Reindex from that archive
+  python3 arxiv_collector.py --no-gap-match     # Skip percolating new papers against open gaps
 """
 
 import argparse
 import arxiv
 import json
+import mmap
 import os
+import queue
 import sys
+import tempfile
+import threading
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
+from arxiv_client import RATE_LIMIT_SECONDS, ResponseCache, TokenBucket, make_client
+from es_bulk import BulkIndexer, bulk_concurrency, encode_record
+from es_transport import transport_stats
+from gap_percolator import GapMatcher
+from ingest_state import IngestCheckpoint
+from paper_archive import PaperArchive
+
 # Load .env
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
@@ -45,8 +65,11 @@ DOMAINS = {
 }
 
 MAX_PER_DOMAIN = 1000
-BULK_CHUNK_SIZE = 500
-RATE_LIMIT_SECONDS = 3
+CACHE_DIR = Path(__file__).parent / ".cache" / "arxiv"
+ARCHIVE_DIR = Path(__file__).parent / "archive"
+CACHE_TTL_SECONDS = 3600  # "recent" queries only; closed backtest windows never expire
+ACTION_LINE_START = b'\n{"index"'  # Start of an action line in the NDJSON archives
+QUEUE_MAXSIZE = 1000  # Papers buffered between fetch and index
 
 
 def extract_arxiv_id(entry_id: str) -> str:
@@ -55,18 +78,24 @@ def extract_arxiv_id(entry_id: str) -> str:
     return entry_id.split("/abs/")[-1].split("v")[0] if "/abs/" in entry_id else entry_id
 
 
-def collect_domain(
+def iter_domain(
     domain_name: str,
     query: str,
     before_year: int | None = None,
     max_results: int = MAX_PER_DOMAIN,
-    seen_ids: set[str] | None = None,
-) -> list[dict]:
-    """Collect papers for a single domain from arXiv.
+    client: arxiv.Client | None = None,
+    since: datetime | None = None,
+    capped: set[str] | None = None,
+):
+    """Yield papers for a single domain from arXiv, newest first.
+
+    Papers are yielded as the arXiv iterator produces them; nothing is
+    buffered here, so callers control memory use.
 
     Args:
-        seen_ids: Set of arxiv_ids already collected in other domains.
-                  Cross-listed papers are skipped to preserve domain accuracy.
+        client: arXiv client to fetch with (default: a new rate-limited client).
+        since: High-watermark; stop at the first paper published before it.
+        capped: Gets domain_name added when max_results ran out before the watermark.
     """
     full_query = query
     if before_year:
@@ -78,11 +107,8 @@ def collect_domain(
     print(f"  Query: {full_query}")
     print(f"{'='*60}")
 
-    client = arxiv.Client(
-        page_size=100,
-        delay_seconds=RATE_LIMIT_SECONDS,
-        num_retries=5,
-    )
+    if client is None:
+        client = make_client()
     search = arxiv.Search(
         query=full_query,
         max_results=max_results,
@@ -90,22 +116,17 @@ def collect_domain(
         sort_order=arxiv.SortOrder.Descending,
     )
 
-    papers = []
-    skipped = 0
     backoff = 5
+    i = -1
 
     for i, result in enumerate(client.results(search)):
-        try:
-            arxiv_id = extract_arxiv_id(result.entry_id)
-
-            if seen_ids is not None and arxiv_id in seen_ids:
-                skipped += 1
-                continue
-            if seen_ids is not None:
-                seen_ids.add(arxiv_id)
+        if since is not None and result.published < since:
+            print(f"  [{domain_name}] Reached watermark {since.isoformat()} after {i} papers")
+            break
 
+        try:
             doc = {
-                "arxiv_id": arxiv_id,
+                "arxiv_id": extract_arxiv_id(result.entry_id),
                 "title": result.title,
                 "abstract": result.summary,
                 "content": f"{result.title}. {result.summary}",
@@ -115,81 +136,244 @@ def collect_domain(
                 "published": result.published.isoformat(),
                 "authors": [a.name for a in result.authors[:10]],
             }
-            papers.append(doc)
-
-            if (i + 1) % 100 == 0:
-                print(f"  Collected {len(papers)}/{max_results} papers"
-                      f"{f' (skipped {skipped} cross-listed)' if skipped else ''}")
-                backoff = 5  # Reset backoff on success
-
         except Exception as e:
             print(f"  Error on paper {i}: {e}")
             time.sleep(backoff)
             backoff = min(backoff * 2, 120)
+            continue
 
-    print(f"  Total collected: {len(papers)} papers"
-          f"{f', skipped {skipped} cross-listed' if skipped else ''}")
-    return papers, skipped
-
-
-def bulk_index(papers: list[dict], index_name: str = "ti-papers") -> dict:
-    """Bulk index papers to Elasticsearch."""
-    if not papers:
-        return {"indexed": 0, "errors": 0}
-
-    total_indexed = 0
-    total_errors = 0
-
-    for chunk_start in range(0, len(papers), BULK_CHUNK_SIZE):
-        chunk = papers[chunk_start:chunk_start + BULK_CHUNK_SIZE]
-
-        # Build NDJSON
-        lines = []
-        for doc in chunk:
-            action = {"index": {"_index": index_name, "_id": doc["arxiv_id"]}}
-            lines.append(json.dumps(action))
-            lines.append(json.dumps(doc, ensure_ascii=False))
-        body = "\n".join(lines) + "\n"
-
-        # Send bulk request
-        backoff = 5
-        for attempt in range(5):
-            try:
-                resp = requests.post(
-                    f"{ES_URL}/_bulk",
-                    headers={
-                        "Content-Type": "application/x-ndjson",
-                        "Authorization": f"ApiKey {ES_API_KEY}",
-                    },
-                    data=body.encode("utf-8"),
-                    timeout=120,
-                )
+        yield doc
 
-                if resp.status_code == 200:
-                    result = resp.json()
-                    errors = sum(1 for item in result.get("items", [])
-                               if item.get("index", {}).get("error"))
-                    indexed = len(chunk) - errors
-                    total_indexed += indexed
-                    total_errors += errors
-                    print(f"  Bulk indexed {chunk_start + len(chunk)}/{len(papers)} "
-                          f"(chunk: {indexed} ok, {errors} errors)")
-                    break
-                else:
-                    print(f"  Bulk request failed ({resp.status_code}), attempt {attempt + 1}/5")
-                    time.sleep(backoff)
-                    backoff = min(backoff * 2, 120)
-
-            except Exception as e:
-                print(f"  Bulk request error: {e}, attempt {attempt + 1}/5")
-                time.sleep(backoff)
-                backoff = min(backoff * 2, 120)
+        if (i + 1) % 100 == 0:
+            print(f"  [{domain_name}] Fetched {i + 1}/{max_results} papers")
+            backoff = 5  # Reset backoff on success
+    else:
+        if since is not None and i + 1 >= max_results:
+            print(f"  WARNING: [{domain_name}] hit --max-per-domain before reaching the "
+                  f"watermark {since.isoformat()}; the watermark is kept, re-run with a "
+                  f"larger --max-per-domain to collect the older papers")
+            if capped is not None:
+                capped.add(domain_name)
+
+
+def release_domain(
+    domain_name: str,
+    docs,
+    seen_ids: set[str],
+    out: queue.Queue,
+    known_ids: set[str] | frozenset = frozenset(),
+    capped: set[str] | frozenset = frozenset(),
+) -> None:
+    """Push one domain's papers onto the pipeline queue, skipping cross-listed ones.
+
+    A paper already in seen_ids was kept by an earlier domain and is skipped
+    to preserve domain accuracy; one in known_ids was indexed by a previous
+    run. Ends with a ("domain_done", ...) marker that says whether the domain
+    is in capped (fetch stopped at --max-per-domain, not at the watermark).
+    """
+    collected = 0
+    skipped = 0
+    known = 0
+    for doc in docs:
+        if doc["arxiv_id"] in known_ids:
+            known += 1
+            continue
+        if doc["arxiv_id"] in seen_ids:
+            skipped += 1
+            continue
+        seen_ids.add(doc["arxiv_id"])
+        out.put(("paper", doc))
+        collected += 1
+
+    print(f"  [{domain_name}] Total collected: {collected} papers"
+          f"{f', skipped {skipped} cross-listed' if skipped else ''}"
+          f"{f', {known} already indexed' if known else ''}")
+    out.put(("domain_done", (domain_name, collected, skipped, known, domain_name in capped)))
+
+
+def produce_sequential(
+    before_year: int | None,
+    max_results: int,
+    seen_ids: set[str],
+    out: queue.Queue,
+    checkpoint: IngestCheckpoint | None = None,
+    cache: ResponseCache | None = None,
+) -> None:
+    """Stream every domain onto the queue, one domain at a time.
+
+    With a checkpoint, each domain stops at its high-watermark and papers
+    indexed by earlier runs are skipped. With a cache, pages already on disk
+    are replayed without touching arXiv.
+    """
+    known_ids = checkpoint.known_ids if checkpoint else frozenset()
+    # One bucket across domains keeps requests spaced without sleeping between them
+    limiter = TokenBucket(rate=1 / RATE_LIMIT_SECONDS)
+    capped: set[str] = set()
+    for domain_name, query in DOMAINS.items():
+        docs = iter_domain(
+            domain_name, query,
+            before_year=before_year,
+            max_results=max_results,
+            client=make_client(limiter, cache),
+            since=checkpoint.watermark(domain_name) if checkpoint else None,
+            capped=capped,
+        )
+        release_domain(domain_name, docs, seen_ids, out, known_ids, capped)
+
+
+def _spool_domain(domain_name: str, query: str, before_year: int | None,
+                  max_results: int, client: arxiv.Client, since: datetime | None,
+                  capped: set[str]):
+    """Fetch one domain into an anonymous temp file, one JSON doc per line."""
+    spool = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+    try:
+        for doc in iter_domain(domain_name, query, before_year=before_year,
+                               max_results=max_results, client=client, since=since,
+                               capped=capped):
+            spool.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def produce_concurrent(
+    before_year: int | None,
+    max_results: int,
+    seen_ids: set[str],
+    out: queue.Queue,
+    workers: int,
+    checkpoint: IngestCheckpoint | None = None,
+    cache: ResponseCache | None = None,
+) -> None:
+    """Stream every domain onto the queue, fetching domains on a worker pool.
+
+    All workers share one token bucket, so the process as a whole stays at
+    one arXiv request per RATE_LIMIT_SECONDS. Each domain is fetched without
+    cross-domain dedup into a disk spool; spools are then released in DOMAINS
+    order and a cross-listed paper is kept by the first domain (in DOMAINS
+    order) that returned it. This is the same assignment the sequential mode
+    makes, regardless of which worker finishes first.
+    """
+    known_ids = checkpoint.known_ids if checkpoint else frozenset()
+    limiter = TokenBucket(rate=1 / RATE_LIMIT_SECONDS)
+    capped: set[str] = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (domain_name, pool.submit(
+                _spool_domain, domain_name, query, before_year, max_results,
+                make_client(limiter, cache),
+                checkpoint.watermark(domain_name) if checkpoint else None,
+                capped,
+            ))
+            for domain_name, query in DOMAINS.items()
+        ]
+        for domain_name, future in futures:
+            with future.result() as spool:
+                docs = (json.loads(line) for line in spool)
+                release_domain(domain_name, docs, seen_ids, out, known_ids, capped)
+
+
+def _segment_bounds(mm: mmap.mmap, segments: int) -> list[tuple[int, int]]:
+    """Split a bulk-format NDJSON archive into (start, end) byte ranges.
+
+    Each boundary is moved forward to the next action line, so every segment
+    holds whole action/source pairs.
+    """
+    size = len(mm)
+    bounds = [0]
+    for k in range(1, segments):
+        found = mm.find(ACTION_LINE_START, max(bounds[-1], size * k // segments))
+        if found == -1:
+            break
+        bounds.append(found + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _iter_archive_records(mm: mmap.mmap, start: int, end: int):
+    """Yield (action_line, source_line) byte pairs between start and end."""
+    pos = start
+    while pos < end:
+        action_end = mm.find(b"\n", pos, end)
+        if action_end == pos:  # Blank line
+            pos += 1
+            continue
+        source_end = mm.find(b"\n", action_end + 1, end) if action_end != -1 else -1
+        if source_end == -1:
+            print(f"  WARNING: truncated record at byte {pos}, skipped", file=sys.stderr)
+            return
+        yield mm[pos:action_end + 1], mm[action_end + 1:source_end + 1]
+        pos = source_end + 1
+
+
+def _load_records(records, index_name: str) -> tuple[list[str], int]:
+    """Index (action_line, source_line) pairs; return (indexed arxiv_ids, error count)."""
+    ok: list[str] = []
+    errors = 0
+
+    def on_result(ok_ids, failed_ids):
+        nonlocal errors
+        ok.extend(ok_ids)
+        errors += len(failed_ids)
+
+    indexer = BulkIndexer(on_result=on_result, concurrency=1)
+    for action_line, source_line in records:
+        action = json.loads(action_line)
+        meta = action["index"]
+        if meta.get("_index") == index_name:
+            record = action_line + source_line
         else:
-            print(f"  GAVE UP on chunk {chunk_start}-{chunk_start + len(chunk)}"
-                  f" after 5 attempts", file=sys.stderr)
-            total_errors += len(chunk)
+            # Retarget (e.g. a new index after a mapping change); the source
+            # line is sent as-is.
+            meta["_index"] = index_name
+            record = (json.dumps(action) + "\n").encode("utf-8") + source_line
+        indexer.add_encoded(meta["_id"], record)
+    indexer.close()
+    return ok, errors
+
+
+def reindex_from_ndjson(paths: list[Path], index_name: str, workers: int) -> dict:
+    """Bulk index local NDJSON archives into index_name without touching arXiv.
 
-    return {"indexed": total_indexed, "errors": total_errors}
+    Each archive is memory-mapped, split into `workers` line-aligned segments,
+    and every segment is streamed to _bulk by its own worker.
+    """
+    stats = {"indexed": 0, "errors": 0, "ok_ids": []}
+    for path in paths:
+        print(f"\nLoading {path} ({path.stat().st_size / 1e6:.1f} MB, {workers} workers)")
+        if path.stat().st_size == 0:
+            continue
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            segments = _segment_bounds(mm, workers)
+            with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+                results = pool.map(
+                    lambda seg: _load_records(_iter_archive_records(mm, *seg), index_name),
+                    segments,
+                )
+                for ok_ids, errors in results:
+                    stats["indexed"] += len(ok_ids)
+                    stats["errors"] += errors
+                    stats["ok_ids"].extend(ok_ids)
+    return stats
+
+
+def reindex_from_archive(root: Path, index_name: str, workers: int) -> dict:
+    """Bulk index a segmented PaperArchive into index_name, one domain per worker."""
+    archive = PaperArchive(root)
+    print(f"\nLoading {root} ({len(archive)} papers, {workers} workers)")
+    stats = {"indexed": 0, "errors": 0, "ok_ids": []}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            lambda domain: _load_records(archive.iter_records(domain), index_name),
+            archive.domains(),
+        )
+        for ok_ids, errors in results:
+            stats["indexed"] += len(ok_ids)
+            stats["errors"] += errors
+            stats["ok_ids"].extend(ok_ids)
+    return stats
 
 
 def main():
@@ -200,50 +384,197 @@ def main():
                         help=f"Max papers per domain (default: {MAX_PER_DOMAIN})")
     parser.add_argument("--index-name", type=str, default="ti-papers",
                         help="Target Elasticsearch index name (default: ti-papers)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Domains to collect concurrently under one shared "
+                             "arXiv rate limit (default: 1, sequential)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Resume from the ingest checkpoint: fetch only papers newer "
+                             "than each domain's watermark, skip already-indexed IDs and "
+                             "append to the NDJSON file instead of overwriting it")
+    parser.add_argument("--cache", action="store_true",
+                        help="Cache arXiv API responses on disk and replay them on re-runs")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR,
+                        help=f"Response cache directory (default: {CACHE_DIR})")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL_SECONDS,
+                        help="Seconds before cached responses for open-ended (recent) "
+                             f"queries are refetched (default: {CACHE_TTL_SECONDS})")
+    parser.add_argument("--bulk-concurrency", type=int, default=bulk_concurrency(),
+                        help="Concurrent _bulk requests in flight "
+                             "(default: ES_BULK_CONCURRENCY or 1)")
+    parser.add_argument("--from-ndjson", type=Path, nargs="+", metavar="PATH",
+                        help="Reindex these local NDJSON archives into --index-name "
+                             "instead of collecting from arXiv (one bulk worker per "
+                             "--bulk-concurrency)")
+    parser.add_argument("--archive", action="store_true",
+                        help="Also append collected papers to the segmented archive "
+                             f"under {ARCHIVE_DIR}")
+    parser.add_argument("--from-archive", type=Path, metavar="DIR",
+                        help="Reindex a segmented archive into --index-name instead of "
+                             "collecting from arXiv (one bulk worker per domain, up to "
+                             "--bulk-concurrency)")
+    parser.add_argument("--no-gap-match", action="store_true",
+                        help="Don't percolate newly indexed papers against the stored "
+                             "queries of open gaps (recent runs only)")
     args = parser.parse_args()
 
+    if args.from_ndjson or args.from_archive:
+        print("=" * 60)
+        print("Terra Incognita — Reindex from local archives")
+        print(f"ES_URL: {ES_URL}")
+        print(f"Index:  {args.index_name}")
+        print("=" * 60)
+
+        if args.from_archive:
+            result = reindex_from_archive(args.from_archive, args.index_name, args.bulk_concurrency)
+        else:
+            result = reindex_from_ndjson(args.from_ndjson, args.index_name, args.bulk_concurrency)
+        checkpoint = IngestCheckpoint(args.index_name, "recent")
+        checkpoint.add_ids(result["ok_ids"])
+        checkpoint.save(compact=True)
+
+        print("\n" + "=" * 60)
+        print("Reindex Complete")
+        print("=" * 60)
+        print(f"Total indexed:   {result['indexed']}")
+        print(f"Total errors:    {result['errors']}")
+        return
+
     label = f"before {args.before}" if args.before else "recent"
     print("=" * 60)
     print(f"Terra Incognita — arXiv Collector ({label})")
     print(f"ES_URL: {ES_URL}")
     print(f"Domains: {len(DOMAINS)}, Papers per domain: {args.max_per_domain}")
     print(f"Index:   {args.index_name}")
+    print(f"Workers: {args.workers} (bulk in flight: {args.bulk_concurrency})")
     print("=" * 60)
 
     ndjson_name = f"papers_before_{args.before}.ndjson" if args.before else "papers.ndjson"
     ndjson_path = Path(__file__).parent / ndjson_name
 
-    if ndjson_path.exists():
+    # Checkpoint is always recorded; --incremental also reads it back.
+    checkpoint = IngestCheckpoint(
+        args.index_name, f"before_{args.before}" if args.before else "recent",
+    )
+    resume = checkpoint if args.incremental else None
+    archive = PaperArchive(ARCHIVE_DIR / ndjson_path.stem) if args.archive else None
+    if args.incremental:
+        print(f"Incremental: {len(checkpoint.known_ids)} known IDs in {checkpoint.path}")
+    elif ndjson_path.exists():
         print(f"WARNING: {ndjson_path} already exists, overwriting")
-    ndjson_path.write_text("")  # Truncate before starting
 
-    total_stats = {"collected": 0, "indexed": 0, "errors": 0, "skipped": 0}
-    seen_ids: set[str] = set()
+    cache = None
+    if args.cache:
+        # A --before window that has already closed can't change, so never expire it
+        closed_window = args.before is not None and args.before <= datetime.now().year
+        cache = ResponseCache(args.cache_dir, ttl=None if closed_window else args.cache_ttl)
+        print(f"Cache:   {args.cache_dir} "
+              f"(ttl: {'none' if cache.ttl is None else f'{cache.ttl:.0f}s'})")
 
-    for domain_name, query in DOMAINS.items():
-        papers, skipped = collect_domain(
-            domain_name, query,
-            before_year=args.before,
-            max_results=args.max_per_domain,
-            seen_ids=seen_ids,
-        )
-        total_stats["collected"] += len(papers)
-        total_stats["skipped"] += skipped
+    total_stats = {"collected": 0, "indexed": 0, "errors": 0, "skipped": 0, "known": 0}
+    seen_ids: set[str] = set()
 
-        # Save to NDJSON file (append per domain, file truncated at start)
-        with open(ndjson_path, "a", encoding="utf-8") as f:
-            for doc in papers:
-                f.write(json.dumps({"index": {"_index": args.index_name, "_id": doc["arxiv_id"]}}) + "\n")
-                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    # Producer thread: arXiv → bounded queue. Main thread: queue → NDJSON + _bulk.
+    papers_queue: queue.Queue = queue.Queue(maxsize=QUEUE_MAXSIZE)
+    producer_errors: list[BaseException] = []
 
-        # Bulk index to ES
-        result = bulk_index(papers, index_name=args.index_name)
-        total_stats["indexed"] += result["indexed"]
-        total_stats["errors"] += result["errors"]
+    def produce():
+        try:
+            if args.workers > 1:
+                produce_concurrent(args.before, args.max_per_domain, seen_ids,
+                                   papers_queue, args.workers, resume, cache)
+            else:
+                produce_sequential(args.before, args.max_per_domain, seen_ids,
+                                   papers_queue, resume, cache)
+        except BaseException as e:
+            producer_errors.append(e)
+        finally:
+            papers_queue.put(None)
+
+    threading.Thread(target=produce, name="arxiv-producer", daemon=True).start()
+
+    in_flight: dict[str, str] = {}    # arxiv_id → domain, added but not yet resolved
+    # Reverse gap matching: only recent papers can fill open gaps
+    matcher = GapMatcher() if args.before is None and not args.no_gap_match else None
+    to_match: dict[str, dict] = {}    # arxiv_id → paper, until its bulk result is known
+    newest: dict[str, str] = {}       # domain → newest published seen this run
+    failed_domains: set[str] = set()  # domains with index errors this run
+
+    def on_bulk_result(ok_ids: list[str], failed_ids: list[str]):
+        total_stats["indexed"] += len(ok_ids)
+        total_stats["errors"] += len(failed_ids)
+
+        # Only successfully indexed IDs become "known" to later runs
+        checkpoint.add_ids(ok_ids)
+        failed_domains.update(in_flight[arxiv_id] for arxiv_id in failed_ids)
+        for arxiv_id in (*ok_ids, *failed_ids):
+            in_flight.pop(arxiv_id, None)
+        checkpoint.save()
+        if matcher is not None:
+            for arxiv_id in failed_ids:
+                to_match.pop(arxiv_id, None)
+            papers = [to_match.pop(arxiv_id) for arxiv_id in ok_ids]
+            if matcher.enabled:
+                try:
+                    for paper in papers:
+                        matcher.add(paper)
+                except Exception as e:
+                    matcher.enabled = False
+                    print(f"WARNING: gap matching failed, disabled for this run: {e}")
+
+    indexer = BulkIndexer(on_result=on_bulk_result, concurrency=args.bulk_concurrency)
+
+    with open(ndjson_path, "ab" if args.incremental else "wb") as ndjson_file:
+        while (item := papers_queue.get()) is not None:
+            kind, payload = item
+            if kind == "paper":
+                # Encoded once; the archive and the _bulk body share the bytes
+                record = encode_record(
+                    {"index": {"_index": args.index_name, "_id": payload["arxiv_id"]}}, payload,
+                )
+                ndjson_file.write(record)
+                if archive is not None:
+                    archive.append(payload["arxiv_id"], payload["domain"], record)
+                domain = payload["domain"]
+                newest[domain] = max(newest.get(domain, ""), payload["published"])
+                in_flight[payload["arxiv_id"]] = domain
+                if matcher is not None:
+                    to_match[payload["arxiv_id"]] = {
+                        "arxiv_id": payload["arxiv_id"],
+                        "content": payload["content"],
+                        "domain": domain,
+                    }
+                indexer.add_encoded(payload["arxiv_id"], record)
+            else:
+                indexer.flush()
+                domain_name, collected, skipped, known, capped = payload
+                total_stats["collected"] += collected
+                total_stats["skipped"] += skipped
+                total_stats["known"] += known
+
+                # Advance the watermark only once the whole domain is indexed;
+                # a domain with failures, or one cut off by --max-per-domain
+                # before its watermark, is re-scanned from the top next time.
+                if domain_name in newest and domain_name not in failed_domains and not capped:
+                    checkpoint.advance(domain_name, newest[domain_name])
+                checkpoint.save(compact=True)
+
+    indexer.close()
+    checkpoint.save(compact=True)
+    if archive is not None:
+        archive.close()
+
+    # Match before surfacing a producer error: these papers are already
+    # checkpointed, so a later run would never percolate them.
+    if matcher is not None:
+        try:
+            gap_match = matcher.close()
+            print(f"Gap matching:    {gap_match['percolated']} papers percolated, "
+                  f"{gap_match['gaps_matched']} open gaps → filling")
+        except Exception as e:
+            print(f"WARNING: gap matching failed: {e}")
 
-        # Rate limit between domains
-        print(f"\n  Waiting {RATE_LIMIT_SECONDS}s before next domain...")
-        time.sleep(RATE_LIMIT_SECONDS)
+    if producer_errors:
+        raise producer_errors[0]
 
     print("\n" + "=" * 60)
     print("Collection Complete")
@@ -251,9 +582,19 @@ def main():
     print(f"Total collected: {total_stats['collected']}")
     print(f"Total indexed:   {total_stats['indexed']}")
     print(f"Total errors:    {total_stats['errors']}")
+    if indexer.stats["retried"]:
+        print(f"Rejected & retried: {indexer.stats['retried']}")
     if total_stats["skipped"]:
         print(f"Cross-listed skipped: {total_stats['skipped']}")
+    if total_stats["known"]:
+        print(f"Already indexed: {total_stats['known']}")
+    if cache is not None:
+        print(f"arXiv cache:     {cache.hits} hits, {cache.misses} misses")
+    conn = transport_stats()
+    print(f"ES connections:  {conn['opened']} opened, {conn['reused']} reused")
     print(f"NDJSON saved:    {ndjson_path}")
+    if archive is not None:
+        print(f"Archive:         {archive.root} ({len(archive)} papers)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+"""Terra Incognita Elasticsearch _bulk engine for the ingest scripts.
+
+BulkIndexer cuts batches by encoded size instead of document count, adapts the
+batch size to observed latency and rejections, and re-sends only the items
+that Elasticsearch rejected under load (429 / es_rejected_execution_exception)
+instead of the whole batch. ELSER inference on semantic_text makes _bulk calls
+slow and bursty, so a fixed 500-doc chunk is either too small or gets
+partially rejected.
+
+Request bodies are streamed from the buffered lines (no joined copy of the
+batch) and gzip-compressed with Content-Encoding: gzip when ES_BULK_GZIP is
+set; abstracts compress about 4x, which matters on slow links to Elastic Cloud.
+
+encode_record() turns an action/source pair into its NDJSON bytes once, so
+callers that also archive the records (arxiv_collector's papers.ndjson) can
+write and send the same buffer. It uses orjson when installed
+(pip install orjson) and falls back to the standard json module.
+
+With ELSER, each _bulk call is mostly server-side inference time, so
+BulkIndexer can keep several requests in flight (ES_BULK_CONCURRENCY, or
+concurrency=) to use the cluster's ingest capacity.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from es_transport import es_request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BULK_TARGET_BYTES = 1 << 20   # Initial batch size (1 MiB)
+BULK_MIN_BYTES = 64 << 10     # Never shrink below 64 KiB
+BULK_MAX_BYTES = 10 << 20     # Never grow beyond 10 MiB
+BULK_TARGET_LATENCY = 10.0    # Seconds; slower responses shrink the next batch
+BULK_MAX_ATTEMPTS = 5
+BULK_GZIP_LEVEL = 6
+
+_RETRYABLE_STATUS = (429, 503)
+_RETRYABLE_ERRORS = ("es_rejected_execution_exception", "circuit_breaking_exception")
+
+
+def _is_retryable(item_result: dict) -> bool:
+    if item_result.get("status") in _RETRYABLE_STATUS:
+        return True
+    return (item_result.get("error") or {}).get("type") in _RETRYABLE_ERRORS
+
+
+def encode_record(action: dict, source: dict) -> bytes:
+    """Encode an action/source pair as two NDJSON lines."""
+    if orjson is not None:
+        return orjson.dumps(action) + b"\n" + orjson.dumps(source) + b"\n"
+    return (json.dumps(action) + "\n"
+            + json.dumps(source, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def gzip_enabled() -> bool:
+    """Whether ES_BULK_GZIP asks for gzip-compressed _bulk bodies."""
+    return os.getenv("ES_BULK_GZIP", "").lower() in ("1", "true", "yes")
+
+
+def bulk_concurrency() -> int:
+    """Max in-flight _bulk requests from ES_BULK_CONCURRENCY (default: 1)."""
+    return max(1, int(os.getenv("ES_BULK_CONCURRENCY", "1")))
+
+
+def iter_body(lines, compress: bool = False):
+    """Yield a _bulk body chunk by chunk from encoded NDJSON lines.
+
+    With compress, the chunks form a single gzip stream.
+    """
+    if not compress:
+        yield from lines
+        return
+    gz = zlib.compressobj(BULK_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for line in lines:
+        chunk = gz.compress(line)
+        if chunk:
+            yield chunk
+    yield gz.flush()
+
+
+class BulkIndexer:
+    """Byte-size-aware, adaptive _bulk sender with per-item retry.
+
+    add() buffers one action/source pair and sends a batch once the buffer
+    reaches the current target size; flush() sends whatever is left and waits
+    for every in-flight request. After each batch is fully resolved,
+    on_result(ok_ids, failed_ids) is called with the _id of every item in it.
+    Batches may complete out of order, but on_result always runs on the
+    thread calling add()/flush(), so callers need no locking.
+
+    compress defaults to ES_BULK_GZIP, concurrency to ES_BULK_CONCURRENCY.
+    """
+
+    def __init__(
+        self,
+        on_result=None,
+        target_bytes: int = BULK_TARGET_BYTES,
+        min_bytes: int = BULK_MIN_BYTES,
+        max_bytes: int = BULK_MAX_BYTES,
+        target_latency: float = BULK_TARGET_LATENCY,
+        max_attempts: int = BULK_MAX_ATTEMPTS,
+        compress: bool | None = None,
+        concurrency: int | None = None,
+    ):
+        self.headers = {"Content-Type": "application/x-ndjson"}
+        self.compress = gzip_enabled() if compress is None else compress
+        if self.compress:
+            self.headers["Content-Encoding"] = "gzip"
+        self.on_result = on_result
+        self.target_bytes = target_bytes
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.max_attempts = max_attempts
+        self.concurrency = bulk_concurrency() if concurrency is None else max(1, concurrency)
+        self.stats = {"ok": 0, "errors": 0, "retried": 0, "requests": 0}
+
+        self._pending: list[tuple[str, bytes]] = []
+        self._pending_bytes = 0
+        self._lock = threading.Lock()  # target_bytes and stats, shared with workers
+        self._pool = (ThreadPoolExecutor(self.concurrency, thread_name_prefix="es-bulk")
+                      if self.concurrency > 1 else None)
+        self._in_flight: set = set()
+
+    def add(self, action: dict, source: dict) -> None:
+        doc_id = next(iter(action.values())).get("_id")
+        self.add_encoded(doc_id, encode_record(action, source))
+
+    def add_encoded(self, doc_id: str, record: bytes) -> None:
+        """Buffer a record already encoded by encode_record()."""
+        self._pending.append((doc_id, record))
+        self._pending_bytes += len(record)
+        if self._pending_bytes >= self.target_bytes:
+            self._submit(self._take())
+
+    def flush(self) -> None:
+        while self._pending:
+            self._submit(self._take())
+        if self._in_flight:
+            self._deliver(wait(self._in_flight).done)
+
+    def close(self) -> None:
+        """Flush, then stop the worker threads."""
+        self.flush()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def _submit(self, batch: list[tuple[str, bytes]]) -> None:
+        if self._pool is None:
+            self._report(*self._send(batch))
+            return
+        if len(self._in_flight) >= self.concurrency:
+            self._deliver(wait(self._in_flight, return_when=FIRST_COMPLETED).done)
+        self._in_flight.add(self._pool.submit(self._send, batch))
+
+    def _deliver(self, futures) -> None:
+        for future in futures:
+            self._in_flight.discard(future)
+            self._report(*future.result())
+
+    def _report(self, ok_ids: list[str], failed_ids: list[str]) -> None:
+        with self._lock:
+            self.stats["ok"] += len(ok_ids)
+            self.stats["errors"] += len(failed_ids)
+        if self.on_result is not None:
+            self.on_result(ok_ids, failed_ids)
+
+    def _take(self) -> list[tuple[str, bytes]]:
+        """Pop items off the buffer up to the current target size (at least one)."""
+        size = 0
+        n = 0
+        while n < len(self._pending) and (n == 0 or size < self.target_bytes):
+            size += len(self._pending[n][1])
+            n += 1
+        batch, self._pending = self._pending[:n], self._pending[n:]
+        self._pending_bytes -= size
+        return batch
+
+    def _adapt(self, took: float, rejected: bool) -> None:
+        """Halve the target on rejections or slow responses, grow it when fast."""
+        with self._lock:
+            if rejected or took > self.target_latency:
+                self.target_bytes = max(self.min_bytes, self.target_bytes // 2)
+            elif took < self.target_latency / 2:
+                self.target_bytes = min(self.max_bytes, int(self.target_bytes * 1.25))
+
+    def _send(self, items: list[tuple[str, bytes]]) -> tuple[list[str], list[str]]:
+        """Send one batch until every item is resolved; return (ok_ids, failed_ids)."""
+        ok_ids: list[str] = []
+        failed_ids: list[str] = []
+        backoff = 5
+        attempt = 0
+
+        while items:
+            if attempt == self.max_attempts:
+                print(f"  GAVE UP on {len(items)} docs after {self.max_attempts} attempts",
+                      file=sys.stderr)
+                failed_ids.extend(doc_id for doc_id, _ in items)
+                break
+            attempt += 1
+
+            body_size = sum(len(line) for _, line in items)
+            start = time.monotonic()
+            try:
+                with self._lock:
+                    self.stats["requests"] += 1
+                resp = es_request(
+                    "POST", "/_bulk",
+                    headers=self.headers,
+                    data=iter_body((line for _, line in items), self.compress),
+                )
+            except Exception as e:
+                print(f"  Bulk request error: {e}, attempt {attempt}/{self.max_attempts}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 120)
+                continue
+            took = time.monotonic() - start
+
+            if resp.status_code == 413 and len(items) > 1:
+                # Too large for http.max_content_length: shrink and split
+                with self._lock:
+                    self.target_bytes = max(self.min_bytes, body_size // 4)
+                mid = len(items) // 2
+                for half in (items[:mid], items[mid:]):
+                    half_ok, half_failed = self._send(half)
+                    ok_ids.extend(half_ok)
+                    failed_ids.extend(half_failed)
+                break
+            if resp.status_code != 200:
+                print(f"  Bulk request failed ({resp.status_code}), "
+                      f"attempt {attempt}/{self.max_attempts}")
+                if resp.status_code in _RETRYABLE_STATUS:
+                    self._adapt(took, rejected=True)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 120)
+                continue
+
+            retry = []
+            errors = 0
+            for (doc_id, line), item in zip(items, resp.json().get("items", [])):
+                result = next(iter(item.values()))
+                if not result.get("error"):
+                    ok_ids.append(doc_id)
+                elif _is_retryable(result):
+                    retry.append((doc_id, line))
+                else:
+                    failed_ids.append(doc_id)
+                    errors += 1
+            self._adapt(took, rejected=bool(retry))
+
+            print(f"  Bulk sent {len(items)} docs ({body_size / 1024:.0f} KiB, {took:.1f}s): "
+                  f"{len(items) - errors - len(retry)} ok, {errors} errors"
+                  f"{f', {len(retry)} rejected (retrying)' if retry else ''}"
+                  f" — next batch {self.target_bytes / 1024:.0f} KiB")
+
+            if retry:
+                with self._lock:
+                    self.stats["retried"] += len(retry)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 120)
+            items = retry
+
+        return ok_ids, failed_ids
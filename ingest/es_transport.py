@@ -0,0 +1,95 @@
+"""Terra Incognita shared Elasticsearch transport for the ingest scripts.
+
+The ingest-side counterpart of _get_es_client() in mcp-server/server.py: one
+pooled, keep-alive requests.Session per process, so bulk and search calls to
+Elastic Cloud reuse TLS connections instead of paying a fresh handshake each.
+
+Configuration (read from the environment on first use):
+  ES_URL, ES_API_KEY     Cluster endpoint and API key
+  ES_POOL_SIZE           Max pooled connections per host (default: 10)
+  ES_CONNECT_TIMEOUT     Seconds (default: 10)
+  ES_READ_TIMEOUT        Seconds (default: 120)
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_timeout: tuple[float, float] = (10.0, 120.0)
+
+_stats = {"opened": 0, "requests": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _count("opened")
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _count("opened")
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools count new connections and requests."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def get_es_session() -> requests.Session:
+    """Singleton Session — reuses TCP/TLS connections across all ES calls."""
+    global _session, _timeout
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = int(os.getenv("ES_POOL_SIZE", "10"))
+                _timeout = (
+                    float(os.getenv("ES_CONNECT_TIMEOUT", "10")),
+                    float(os.getenv("ES_READ_TIMEOUT", "120")),
+                )
+                adapter = _CountingAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["Authorization"] = f"ApiKey {os.environ['ES_API_KEY']}"
+                _session = session
+    return _session
+
+
+def es_request(method: str, path: str, **kwargs) -> requests.Response:
+    """Send a request to ES_URL + path over the shared session."""
+    session = get_es_session()
+    kwargs.setdefault("timeout", _timeout)
+    return session.request(method, f"{os.environ['ES_URL']}{path}", **kwargs)
+
+
+def transport_stats() -> dict:
+    """Connections opened, requests sent and connection reuses so far."""
+    with _stats_lock:
+        return {**_stats, "reused": max(0, _stats["requests"] - _stats["opened"])}
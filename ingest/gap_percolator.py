@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Terra Incognita reverse gap matching for the ingest scripts.
+
+Every open gap in ti-gaps has a stored query in ti-gap-percolator: the MCP
+server registers it when the gap is saved, and `register` backfills gaps
+saved before that. After a collection run, GapMatcher percolates only the
+newly indexed papers against those stored queries, PERCOLATE_BATCH papers per
+request, and moves the matched gaps to "filling" in one _bulk update. The
+cost follows the number of new papers instead of gaps × the watch window.
+
+Percolation can't run ELSER, so stored queries match content lexically
+(GAP_MATCH_MIN_SHOULD of the gap_concept terms) within the gap's domain.
+The stored query layout is shared with mcp-server/server.py — keep the two
+in sync.
+
+Usage:
+  python3 gap_percolator.py register    # Store queries for all open gaps
+"""
+
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+from es_bulk import BulkIndexer
+from es_export import export_columns
+from es_transport import es_request
+
+GAPS_INDEX = "ti-gaps"
+PERCOLATOR_INDEX = "ti-gap-percolator"
+GAP_MATCH_MIN_SHOULD = "75%"   # Share of gap_concept terms a paper must contain
+PERCOLATE_BATCH = 500          # Papers per percolate request
+PERCOLATE_MAX_GAPS = 10000     # Matched gaps returned per request
+
+
+def gap_query_doc(gap: dict) -> dict:
+    """Stored query matching papers that may fill a gap."""
+    return {
+        "query": {
+            "bool": {
+                "must": [{"match": {"content": {
+                    "query": gap["gap_concept"],
+                    "minimum_should_match": GAP_MATCH_MIN_SHOULD,
+                }}}],
+                "filter": [{"term": {"domain": gap["gap_domain"]}}],
+            },
+        },
+        "gap_domain": gap["gap_domain"],
+        "status": gap.get("status") or "open",
+    }
+
+
+def register_open_gaps() -> dict:
+    """(Re)store the query of every open gap that has a gap_concept and gap_domain."""
+    gaps = export_columns(
+        GAPS_INDEX, ["gap_concept", "gap_domain", "status"],
+        {"id": lambda hit: hit["_id"], "source": lambda hit: hit.get("_source", {})},
+        query={"term": {"status": "open"}},
+        slices=1,
+    )
+    indexer = BulkIndexer()
+    skipped = 0
+    for gap_id, src in zip(gaps["id"], gaps["source"]):
+        if not src.get("gap_concept") or not src.get("gap_domain"):
+            skipped += 1
+            continue
+        indexer.add({"index": {"_index": PERCOLATOR_INDEX, "_id": gap_id}}, gap_query_doc(src))
+    indexer.close()
+    return {"registered": indexer.stats["ok"], "errors": indexer.stats["errors"],
+            "skipped": skipped}
+
+
+def mark_gaps_filling(paper_counts: dict[str, int]) -> dict:
+    """Move gaps (and their stored queries) to "filling" in one _bulk update."""
+    watched_at = datetime.now(timezone.utc).isoformat()
+    indexer = BulkIndexer()
+    for gap_id, count in paper_counts.items():
+        indexer.add({"update": {"_index": GAPS_INDEX, "_id": gap_id}}, {"doc": {
+            "status": "filling",
+            "last_watch_at": watched_at,
+            "filling_paper_count": count,
+        }})
+        indexer.add({"update": {"_index": PERCOLATOR_INDEX, "_id": gap_id}},
+                    {"doc": {"status": "filling"}})
+    indexer.close()
+    return indexer.stats
+
+
+class GapMatcher:
+    """Percolates newly indexed papers against open gaps in batches.
+
+    add() buffers a paper and sends a percolate request every batch_size
+    papers; close() sends the rest, updates the matched gaps and returns
+    {"percolated", "gaps_matched", "errors"}. If ti-gap-percolator doesn't
+    exist yet, matching is switched off with a warning.
+    """
+
+    def __init__(self, batch_size: int = PERCOLATE_BATCH):
+        self.batch_size = batch_size
+        self.enabled = True
+        self.percolated = 0
+        self.matches: dict[str, set[str]] = {}
+        self._batch: list[dict] = []
+
+    def add(self, paper: dict) -> None:
+        if not self.enabled:
+            return
+        self._batch.append({
+            "arxiv_id": paper["arxiv_id"],
+            "content": paper.get("content", ""),
+            "domain": paper.get("domain"),
+        })
+        if len(self._batch) >= self.batch_size:
+            self._percolate()
+
+    def _percolate(self) -> None:
+        batch, self._batch = self._batch, []
+        if not batch or not self.enabled:
+            return
+        resp = es_request("POST", f"/{PERCOLATOR_INDEX}/_search", json={
+            "query": {
+                "bool": {
+                    "filter": [
+                        {"term": {"status": "open"}},
+                        {"percolate": {
+                            "field": "query",
+                            "documents": [{"content": p["content"], "domain": p["domain"]}
+                                          for p in batch],
+                        }},
+                    ],
+                },
+            },
+            "_source": False,
+            "size": PERCOLATE_MAX_GAPS,
+            "track_total_hits": False,
+        }, timeout=60)
+        if resp.status_code == 404:
+            print(f"  WARNING: {PERCOLATOR_INDEX} not found, gap matching skipped "
+                  "(run setup/01-indices.sh and `gap_percolator.py register`)")
+            self.enabled = False
+            return
+        resp.raise_for_status()
+
+        self.percolated += len(batch)
+        for hit in resp.json().get("hits", {}).get("hits", []):
+            slots = hit.get("fields", {}).get("_percolator_document_slot", [])
+            self.matches.setdefault(hit["_id"], set()).update(batch[slot]["arxiv_id"] for slot in slots)
+
+    def close(self) -> dict:
+        self._percolate()
+        stats = {"errors": 0}
+        if self.matches:
+            stats = mark_gaps_filling({gap_id: len(ids) for gap_id, ids in self.matches.items()})
+        return {"percolated": self.percolated, "gaps_matched": len(self.matches),
+                "errors": stats["errors"]}
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent.parent / ".env")
+
+    parser = argparse.ArgumentParser(description="Terra Incognita gap percolator")
+    parser.add_argument("command", choices=["register"])
+    parser.parse_args()
+
+    result = register_open_gaps()
+    print(f"Registered {result['registered']} open gap queries in {PERCOLATOR_INDEX} "
+          f"({result['errors']} errors, {result['skipped']} without concept/domain)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,61 @@
 #!/usr/bin/env python3
 """Terra Incognita — 벡터 공간 시각화 좌표 생성
 
-논문 코퍼스의 2D 시각화 좌표를 생성하여 ES에 업데이트합니다.
-TF-IDF → t-SNE로 차원 축소 후 viz_x, viz_y 필드에 저장합니다.
+논문 코퍼스를 TF-IDF → TruncatedSVD → t-SNE(또는 UMAP)로 2D에 배치해 ES의
+viz_x, viz_y에 쓰고, 대시보드용 밀도 격자를 ti-landscape-grid에 씁니다.
+학습된 모델과 토큰 캐시는 TI_STATE_DIR/<index>/ 아래에 보관합니다.
+
+주요 옵션:
+    --incremental       좌표 없는 새 논문만 기존 지도에 kNN 보간으로 배치
+    --warm-start        이전 좌표에서 t-SNE를 시작해 레이아웃을 유지
+    --from-snapshot     ES 대신 paper_snapshot.py 로컬 스냅샷에서 읽기
+    --engine            exact | barnes_hut(기본) | knn_graph | umap
+    --svd-components    SVD 차원(0이면 밀집 TF-IDF를 그대로 사용)
+    --compare, --benchmark-engines, --quality-report
+                        ES를 건드리지 않는 비교/품질 측정
+    --no-grid           밀도 격자 쓰기 생략
+나머지 옵션(병렬도, 캐시, 내보내기 슬라이스)은 --help를 참고하세요.
 
 Usage:
     pip install -r requirements-viz.txt
     python generate_viz_coords.py
+    python generate_viz_coords.py --incremental
+    python paper_snapshot.py sync && python generate_viz_coords.py --from-snapshot
 """
 
-import json
+import argparse
 import os
 import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
 from pathlib import Path
 
+import joblib
 import numpy as np
-import requests
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.manifold import TSNE
+from scipy import sparse
+from scipy.linalg import orthogonal_procrustes
+from sklearn.decomposition import PCA, TruncatedSVD
+from sklearn.manifold import TSNE, trustworthiness
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import normalize
+
+from es_bulk import BulkIndexer
+from es_export import EXPORT_SLICES, export_columns
+from es_transport import es_request, transport_stats
+from paper_snapshot import DEFAULT_SNAPSHOT_DIR, PaperSnapshot
+from text_vectors import TfidfModel, VectorCache
+
+try:
+    from pynndescent import NNDescent
+except ImportError:
+    NNDescent = None
+
+try:
+    import umap
+except ImportError:
+    umap = None
 
 # Load .env
 env_path = Path(__file__).parent.parent / ".env"
@@ -31,116 +68,477 @@ if not ES_URL or not ES_API_KEY:
     print("ERROR: ES_URL and ES_API_KEY must be set in .env")
     sys.exit(1)
 
-ES_HEADERS = {
-    "Authorization": f"ApiKey {ES_API_KEY}",
-    "Content-Type": "application/json",
-}
-
-SCROLL_SIZE = 1000
-SCROLL_TIMEOUT = "5m"
 INDEX = "ti-papers"
+GRID_INDEX = "ti-landscape-grid"
+
+# 격자 해상도: 축당 셀 수 (셀 크기 10, 5, 2, 1)
+GRID_LEVELS = (10, 20, 50, 100)
+
+# PIT 내보내기: 필요한 _source 필드만
+EXPORT_SOURCE_FIELDS = ["content", "domain", "title", "viz_x", "viz_y"]
 
 # t-SNE 파라미터
 TSNE_PERPLEXITY = 30
 TSNE_RANDOM_STATE = 42
 TSNE_MAX_ITER = 1000
 
-# Bulk update 청크 크기
-BULK_CHUNK_SIZE = 500
-
-
-def fetch_all_papers() -> list[dict]:
-    """ES scroll API로 전체 논문을 가져옵니다."""
-    papers = []
-
-    # Initial search with scroll
-    resp = requests.post(
-        f"{ES_URL}/{INDEX}/_search?scroll={SCROLL_TIMEOUT}",
-        headers=ES_HEADERS,
-        json={
-            "size": SCROLL_SIZE,
-            "_source": ["arxiv_id", "content", "domain", "title"],
-            "query": {"match_all": {}},
+# warm start: 이전 좌표에서 시작하므로 반복 수를 줄이고 수렴 시 조기 종료
+# (scikit-learn은 최소 250회의 탐색 단계를 항상 거칩니다)
+WARM_MAX_ITER = 500
+WARM_MIN_GRAD_NORM = 1e-5
+WARM_ITER_WITHOUT_PROGRESS = 100
+
+# t-SNE 전 희소 TF-IDF 축소 차원 (0이면 밀집 변환 후 바로 t-SNE)
+SVD_COMPONENTS = 50
+
+# 레이아웃 엔진과 품질 측정(표본 크기, 이웃 수)
+ENGINES = ("exact", "barnes_hut", "knn_graph", "umap")
+DEFAULT_ENGINE = "barnes_hut"
+UMAP_NEIGHBORS = 15
+QUALITY_SAMPLE = 2000
+QUALITY_NEIGHBORS = 10
+
+# 증분 배치: 기준 논문 중 최근접 이웃 수
+KNN_NEIGHBORS = 10
+VIZ_MODEL_FILE = "viz_model.joblib"
+VECTOR_CACHE_DIR = "vectors"
+
+
+def _paper_text(src: dict) -> str:
+    return src.get("content", "") or f"{src.get('title', '')}. {src.get('abstract', '')}"
+
+
+def fetch_all_papers(query: dict | None = None, slices: int = EXPORT_SLICES) -> dict:
+    """PIT + search_after 슬라이스 병렬 읽기로 전체 논문(또는 query 결과)을 가져옵니다.
+
+    결과는 컬럼 형태입니다: ids/text/domain은 리스트, viz_x/viz_y는 float
+    배열(좌표 없으면 NaN). _index, _score 등 hit 메타데이터는 보관하지 않습니다.
+    """
+    papers = export_columns(
+        INDEX,
+        EXPORT_SOURCE_FIELDS,
+        {
+            "ids": lambda hit: hit["_id"],
+            "text": lambda hit: _paper_text(hit.get("_source", {})),
+            "domain": lambda hit: hit.get("_source", {}).get("domain", "unknown"),
+            "viz_x": lambda hit: hit.get("_source", {}).get("viz_x"),
+            "viz_y": lambda hit: hit.get("_source", {}).get("viz_y"),
         },
-        timeout=60,
+        query,
+        slices,
     )
-    resp.raise_for_status()
-    data = resp.json()
-
-    scroll_id = data.get("_scroll_id")
-    hits = data.get("hits", {}).get("hits", [])
-    papers.extend(hits)
-    print(f"  Fetched {len(papers)} papers...")
-
-    # Continue scrolling
-    while hits:
-        resp = requests.post(
-            f"{ES_URL}/_search/scroll",
-            headers=ES_HEADERS,
-            json={"scroll": SCROLL_TIMEOUT, "scroll_id": scroll_id},
-            timeout=60,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        scroll_id = data.get("_scroll_id")
-        hits = data.get("hits", {}).get("hits", [])
-        papers.extend(hits)
-        if hits:
-            print(f"  Fetched {len(papers)} papers...")
-
-    # Clear scroll
-    try:
-        requests.delete(
-            f"{ES_URL}/_search/scroll",
-            headers=ES_HEADERS,
-            json={"scroll_id": scroll_id},
-            timeout=10,
-        )
-    except Exception:
-        pass
+    for key in ("viz_x", "viz_y"):
+        papers[key] = np.array([np.nan if v is None else v for v in papers[key]], dtype=np.float64)
+    print(f"  Fetched {len(papers['ids'])} papers ({slices} slices)")
+    return papers
+
 
+def load_snapshot_papers(snapshot: PaperSnapshot, slices: int = EXPORT_SLICES) -> dict:
+    """로컬 스냅샷에서 fetch_all_papers와 같은 컬럼 형태로 논문을 읽습니다.
+
+    viz_x/viz_y는 다른 실행이 ES에 쓴 뒤 스냅샷에 남은 옛 값일 수 있으므로, 읽기
+    전에 좌표 컬럼만 ES에서 다시 동기화합니다. 그래야 bulk_update_coords의 변경
+    비교와 증분 실행의 새 논문 선택이 ES 기준이 됩니다.
+    """
+    refreshed = snapshot.sync_coords(INDEX, slices)
+    print(f"  Coordinates refreshed from ES: {refreshed}")
+    titles = snapshot.column("title")
+    papers = {
+        "ids": list(snapshot.column("arxiv_id")),
+        "text": [_paper_text({"content": content, "title": titles[i]})
+                 for i, content in enumerate(snapshot.column("content"))],
+        "domain": list(snapshot.column("domain")),
+        "viz_x": np.asarray(snapshot.column("viz_x"), dtype=np.float64),
+        "viz_y": np.asarray(snapshot.column("viz_y"), dtype=np.float64),
+    }
+    print(f"  Loaded {len(papers['ids'])} papers from {snapshot.root} "
+          f"(synced {snapshot.meta['synced_at']})")
     return papers
 
 
-def compute_2d_coords(papers: list[dict]) -> np.ndarray:
-    """TF-IDF + t-SNE로 2D 좌표를 계산합니다."""
-    # Extract content for TF-IDF
-    contents = []
-    for p in papers:
-        src = p.get("_source", {})
-        text = src.get("content", "") or f"{src.get('title', '')}. {src.get('abstract', '')}"
-        contents.append(text)
+def select_papers(papers: dict, mask: np.ndarray) -> dict:
+    """mask가 참인 행만 남긴 컬럼 dict를 반환합니다."""
+    rows = np.flatnonzero(mask)
+    return {key: values[rows] if isinstance(values, np.ndarray) else [values[i] for i in rows]
+            for key, values in papers.items()}
+
+
+def vectorize_papers(
+    papers: dict,
+    cache: VectorCache | None = None,
+    workers: int = 1,
+) -> tuple[TfidfModel, sparse.csr_matrix]:
+    """논문 본문을 TF-IDF 희소 행렬(CSR)로 변환합니다. (vectorizer, 행렬)을 반환합니다.
+
+    cache에 없는(또는 본문이 바뀐) 논문만 workers개 프로세스로 토큰화합니다.
+    """
+    if cache is None:
+        cache = VectorCache()
+    docs = list(zip(papers["ids"], papers["text"]))
 
-    print(f"  Vectorizing {len(contents)} documents with TF-IDF...")
-    vectorizer = TfidfVectorizer(
+    print(f"  Vectorizing {len(docs)} documents with TF-IDF...")
+    hits, misses = cache.hits, cache.misses
+    counts = cache.counts_for(docs, workers)
+    print(f"  Term counts: {cache.hits - hits} cached, {cache.misses - misses} tokenized")
+    vectorizer = TfidfModel(
         max_features=5000,
-        stop_words="english",
         min_df=2,
         max_df=0.95,
     )
-    tfidf_matrix = vectorizer.fit_transform(contents)
-    print(f"  TF-IDF matrix shape: {tfidf_matrix.shape}")
-
+    tfidf_matrix = vectorizer.fit_transform(counts, cache.vocabulary)
+    print(f"  TF-IDF matrix shape: {tfidf_matrix.shape} (nnz={tfidf_matrix.nnz})")
+    return vectorizer, tfidf_matrix
+
+
+def reduce_features(tfidf_matrix, svd_components: int = SVD_COMPONENTS):
+    """t-SNE 입력용 밀집 행렬을 만듭니다. (svd 또는 None, 행렬)을 반환합니다.
+
+    svd_components > 0이면 희소 행렬에 TruncatedSVD(LSA)를 바로 적용하고
+    행을 다시 L2 정규화합니다. 0이면 기존처럼 전체를 밀집 행렬로 변환합니다.
+    """
+    if svd_components <= 0:
+        return None, tfidf_matrix.toarray()
+
+    n_components = min(svd_components, tfidf_matrix.shape[1] - 1)
+    print(f"  Reducing sparse TF-IDF with TruncatedSVD (n_components={n_components})...")
+    svd = TruncatedSVD(n_components=n_components, random_state=TSNE_RANDOM_STATE)
+    reduced = normalize(svd.fit_transform(tfidf_matrix)).astype(np.float32)
+    print(f"  SVD explained variance: {svd.explained_variance_ratio_.sum():.1%}")
+    return svd, reduced
+
+
+def stored_coords(papers: dict) -> tuple[np.ndarray, np.ndarray]:
+    """ES에 저장된 viz_x/viz_y를 (N×2 좌표, 좌표 보유 마스크)로 반환합니다."""
+    coords = np.column_stack([papers["viz_x"], papers["viz_y"]])
+    has_coords = ~np.isnan(coords).any(axis=1)
+    return np.nan_to_num(coords), has_coords
+
+
+def warm_start_init(features, previous: np.ndarray, has_coords: np.ndarray) -> np.ndarray:
+    """이전 좌표로 t-SNE 초기값을 만듭니다.
+
+    좌표가 없는 논문은 특징 공간의 최근접 이웃(좌표 보유)들의 유사도 가중
+    평균으로 채우고, scikit-learn의 PCA 초기화와 같은 척도(첫 축 표준편차
+    1e-4)로 맞춥니다.
+    """
+    init = previous.copy()
+    missing = ~has_coords
+    if missing.any():
+        known = np.flatnonzero(has_coords)
+        knn = NearestNeighbors(n_neighbors=min(KNN_NEIGHBORS, len(known)), metric="cosine")
+        distances, indices = knn.fit(features[known]).kneighbors(features[missing])
+        weights = np.clip(1.0 - distances, 1e-6, None)
+        init[missing] = ((previous[known][indices] * weights[:, :, None]).sum(axis=1)
+                         / weights.sum(axis=1, keepdims=True))
+    init -= init.mean(axis=0)
+    return init / (init[:, 0].std() or 1.0) * 1e-4
+
+
+def align_to_previous(coords: np.ndarray, previous: np.ndarray, has_coords: np.ndarray) -> np.ndarray:
+    """좌표 보유 논문 기준으로 새 레이아웃을 이전 지도에 회전/반전 정렬합니다."""
+    source = coords[has_coords] - coords[has_coords].mean(axis=0)
+    target = previous[has_coords] - previous[has_coords].mean(axis=0)
+    rotation, _ = orthogonal_procrustes(source, target)
+    return (coords - coords[has_coords].mean(axis=0)) @ rotation
+
+
+def _perplexity(n_samples: int) -> int:
     # Adjust perplexity if fewer samples
-    perplexity = min(TSNE_PERPLEXITY, len(papers) - 1)
+    perplexity = min(TSNE_PERPLEXITY, n_samples - 1)
     if perplexity < 5:
         perplexity = 5
-
-    print(f"  Running t-SNE (perplexity={perplexity}, n_iter={TSNE_MAX_ITER})...")
+    return perplexity
+
+
+def _pca_init(features) -> np.ndarray:
+    """scikit-learn의 init="pca"와 같은 초기값(첫 축 표준편차 1e-4)."""
+    init = PCA(n_components=2, random_state=TSNE_RANDOM_STATE).fit_transform(features)
+    return init / (init[:, 0].std() or 1.0) * 1e-4
+
+
+def knn_graph(features, n_neighbors: int, n_jobs: int | None = None):
+    """제곱 유클리드 거리의 희소 kNN 그래프(자기 자신 제외)를 만듭니다.
+
+    pynndescent가 설치되어 있으면 근사 탐색(NN-descent), 없으면 정확한 탐색을
+    씁니다. t-SNE(metric="precomputed")는 거리를 제곱하지 않으므로 여기서 제곱합니다.
+    """
+    n = features.shape[0]
+    if NNDescent is not None:
+        index = NNDescent(features, n_neighbors=n_neighbors + 1,
+                          random_state=TSNE_RANDOM_STATE, n_jobs=n_jobs or -1)
+        indices, distances = index.neighbor_graph
+        indices, distances = indices[:, 1:], distances[:, 1:]
+        graph = sparse.csr_matrix(
+            (distances.ravel().astype(np.float32), indices.ravel(),
+             np.arange(0, n * n_neighbors + 1, n_neighbors)),
+            shape=(n, n),
+        )
+    else:
+        print("  pynndescent not installed; building an exact kNN graph")
+        knn = NearestNeighbors(n_neighbors=n_neighbors, n_jobs=n_jobs).fit(features)
+        graph = knn.kneighbors_graph(mode="distance")
+    graph.data **= 2
+    return graph
+
+
+def run_tsne(
+    features,
+    init: np.ndarray | None = None,
+    method: str = "barnes_hut",
+    n_jobs: int | None = None,
+    precomputed=None,
+) -> np.ndarray:
+    """특징 행렬(또는 precomputed kNN 그래프)을 t-SNE로 2D에 임베딩합니다.
+
+    init이 주어지면 그 좌표에서 시작하고, 조기 과장 없이 WARM_MAX_ITER 안에서
+    수렴 시 조기 종료합니다.
+    """
+    perplexity = _perplexity(features.shape[0])
+
+    if init is None:
+        # precomputed 거리에는 init="pca"를 쓸 수 없어 특징 행렬로 직접 계산
+        params = {"init": "pca" if precomputed is None else _pca_init(features),
+                  "max_iter": TSNE_MAX_ITER}
+    else:
+        params = {
+            "init": init,
+            "max_iter": WARM_MAX_ITER,
+            "early_exaggeration": 1.0,
+            "min_grad_norm": WARM_MIN_GRAD_NORM,
+            "n_iter_without_progress": WARM_ITER_WITHOUT_PROGRESS,
+        }
+    if precomputed is not None:
+        params["metric"] = "precomputed"
+
+    print(f"  Running t-SNE ({method}{', kNN graph' if precomputed is not None else ''}) "
+          f"on {features.shape} (perplexity={perplexity}, "
+          f"n_iter={params['max_iter']}{', warm start' if init is not None else ''})...")
     tsne = TSNE(
         n_components=2,
         perplexity=perplexity,
         random_state=TSNE_RANDOM_STATE,
-        max_iter=TSNE_MAX_ITER,
         learning_rate="auto",
-        init="pca",
+        method=method,
+        n_jobs=n_jobs,
+        **params,
+    )
+    coords_2d = tsne.fit_transform(features if precomputed is None else precomputed)
+    print(f"  t-SNE complete after {tsne.n_iter_} iterations "
+          f"(KL={tsne.kl_divergence_:.3f}). Shape: {coords_2d.shape}")
+    return coords_2d
+
+
+def run_umap(features, init: np.ndarray | None = None, n_jobs: int | None = None) -> np.ndarray:
+    """UMAP(근사 kNN 그래프 기반)으로 2D에 임베딩합니다."""
+    if umap is None:
+        print("ERROR: --engine umap needs umap-learn (pip install umap-learn)")
+        sys.exit(1)
+    print(f"  Running UMAP on {features.shape} (n_neighbors={UMAP_NEIGHBORS})...")
+    reducer = umap.UMAP(
+        n_components=2,
+        n_neighbors=UMAP_NEIGHBORS,
+        init=init if init is not None else "spectral",
+        # random_state를 고정하면 UMAP은 단일 스레드로 동작합니다
+        random_state=TSNE_RANDOM_STATE if n_jobs == 1 else None,
+        n_jobs=n_jobs or -1,
     )
-    coords_2d = tsne.fit_transform(tfidf_matrix.toarray())
-    print(f"  t-SNE complete. Shape: {coords_2d.shape}")
+    coords_2d = reducer.fit_transform(features)
+    print(f"  UMAP complete. Shape: {coords_2d.shape}")
+    return coords_2d
+
 
+def run_layout(
+    features,
+    engine: str = DEFAULT_ENGINE,
+    init: np.ndarray | None = None,
+    n_jobs: int | None = None,
+) -> np.ndarray:
+    """engine으로 2D 레이아웃을 계산하고 소요 시간을 출력합니다."""
+    start = time.monotonic()
+    if engine == "umap":
+        coords_2d = run_umap(features, init, n_jobs)
+    elif engine == "knn_graph":
+        # scikit-learn은 precomputed 그래프에 3 * perplexity + 2개의 이웃을 요구합니다
+        n_neighbors = min(features.shape[0] - 1, int(3 * _perplexity(features.shape[0]) + 2))
+        graph = knn_graph(features, n_neighbors, n_jobs)
+        coords_2d = run_tsne(features, init, "barnes_hut", n_jobs, precomputed=graph)
+    else:
+        coords_2d = run_tsne(features, init, engine, n_jobs)
+    print(f"  Layout ({engine}) took {time.monotonic() - start:.1f}s")
     return coords_2d
 
 
+def layout_quality(features, coords: np.ndarray, n_jobs: int | None = None) -> dict:
+    """표본 QUALITY_SAMPLE개로 레이아웃 품질을 측정합니다.
+
+    trustworthiness: 표본 안에서 2D 이웃이 원공간에서도 가까운 정도(1이 최선).
+    knn_preservation: 원공간 k-최근접 이웃 중 2D에서도 k-최근접으로 남은 비율
+    (표본 논문마다 전체 코퍼스 기준으로 계산).
+    """
+    n = features.shape[0]
+    rng = np.random.default_rng(TSNE_RANDOM_STATE)
+    rows = np.sort(rng.choice(n, min(QUALITY_SAMPLE, n), replace=False))
+    k = min(QUALITY_NEIGHBORS, (len(rows) - 1) // 2)  # trustworthiness: k < 표본 수 / 2
+
+    high = NearestNeighbors(n_neighbors=k + 1, n_jobs=n_jobs).fit(features)
+    low = NearestNeighbors(n_neighbors=k + 1, n_jobs=n_jobs).fit(coords)
+    high_nn = high.kneighbors(features[rows], return_distance=False)[:, 1:]
+    low_nn = low.kneighbors(coords[rows], return_distance=False)[:, 1:]
+    preserved = np.mean([len(np.intersect1d(h, l)) / k for h, l in zip(high_nn, low_nn)])
+
+    return {
+        "trustworthiness": float(trustworthiness(features[rows], coords[rows], n_neighbors=k)),
+        "knn_preservation": float(preserved),
+        "sample": len(rows),
+        "k": k,
+    }
+
+
+def benchmark_engines(features, engines: list[str], n_jobs: int | None = None) -> list[dict]:
+    """같은 특징 행렬에 여러 엔진을 돌려 시간과 품질을 비교합니다."""
+    rows = []
+    for engine in engines:
+        print(f"\n  [{engine}]")
+        start = time.monotonic()
+        coords_2d = run_layout(features, engine, n_jobs=n_jobs)
+        elapsed = time.monotonic() - start
+        rows.append({"engine": engine, "seconds": elapsed,
+                     **layout_quality(features, coords_2d, n_jobs)})
+    return rows
+
+
+def compute_2d_coords(
+    papers: dict,
+    svd_components: int = SVD_COMPONENTS,
+    warm_start: bool = False,
+    cache: VectorCache | None = None,
+    workers: int = 1,
+    engine: str = DEFAULT_ENGINE,
+    n_jobs: int | None = None,
+) -> tuple[np.ndarray, dict]:
+    """TF-IDF → (TruncatedSVD) → 레이아웃 엔진(기본 t-SNE)으로 2D 좌표를 계산합니다.
+
+    (좌표, 모델)을 반환합니다. 모델은 증분 배치에 필요한 vectorizer, svd,
+    기준 특징 행렬을 담습니다. warm_start면 저장된 viz_x/viz_y에서 시작해
+    결과를 이전 지도에 정렬합니다(저장된 좌표가 없으면 PCA 초기화).
+    """
+    vectorizer, tfidf_matrix = vectorize_papers(papers, cache, workers)
+    svd, features = reduce_features(tfidf_matrix, svd_components)
+
+    previous, has_coords = stored_coords(papers)
+    if warm_start and has_coords.sum() >= 2:
+        print(f"  Warm start from {has_coords.sum()} stored coordinates "
+              f"({(~has_coords).sum()} seeded from neighbours)")
+        init = warm_start_init(features, previous, has_coords)
+        coords = run_layout(features, engine, init, n_jobs)
+        coords = align_to_previous(coords, previous, has_coords)
+    else:
+        if warm_start:
+            print("  No stored coordinates; falling back to PCA initialization")
+        coords = run_layout(features, engine, n_jobs=n_jobs)
+    # 증분 배치의 kNN 공간: SVD가 없으면 희소 TF-IDF 그대로 보관
+    model = {"vectorizer": vectorizer, "svd": svd,
+             "features": features if svd is not None else tfidf_matrix}
+    return coords, model
+
+
+def _state_dir() -> Path:
+    state_dir = os.getenv("TI_STATE_DIR") or Path(__file__).parent / ".state"
+    return Path(state_dir) / INDEX
+
+
+def _viz_model_path() -> Path:
+    return _state_dir() / VIZ_MODEL_FILE
+
+
+def save_viz_model(model: dict) -> Path:
+    """모델을 원자적으로 저장합니다."""
+    path = _viz_model_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def load_viz_model() -> dict | None:
+    try:
+        return joblib.load(_viz_model_path())
+    except FileNotFoundError:
+        return None
+
+
+def project_new_papers(model: dict, papers: dict) -> tuple[np.ndarray, object]:
+    """새 논문을 기존 지도 위에 kNN 보간으로 배치합니다.
+
+    저장된 vectorizer/SVD로 변환한 뒤, 코사인 거리 기준 최근접 기준 논문
+    KNN_NEIGHBORS개의 (정규화된) 좌표를 유사도로 가중 평균합니다.
+    (좌표, 새 논문의 특징 행렬)을 반환합니다.
+    """
+    features = model["vectorizer"].transform(papers["text"])
+    if model["svd"] is not None:
+        features = normalize(model["svd"].transform(features)).astype(np.float32)
+
+    n_neighbors = min(KNN_NEIGHBORS, model["features"].shape[0])
+    knn = NearestNeighbors(n_neighbors=n_neighbors, metric="cosine").fit(model["features"])
+    distances, indices = knn.kneighbors(features)
+
+    weights = np.clip(1.0 - distances, 1e-6, None)
+    neighbor_coords = model["coords"][indices]  # (n, k, 2)
+    coords = (neighbor_coords * weights[:, :, None]).sum(axis=1) / weights.sum(axis=1, keepdims=True)
+    return coords, features
+
+
+def extend_viz_model(model: dict, papers: dict, features, coords: np.ndarray) -> None:
+    """배치한 논문을 기준 집합에 추가해 다음 증분 실행의 이웃으로 씁니다."""
+    stack = sparse.vstack if sparse.issparse(model["features"]) else np.vstack
+    model["features"] = stack([model["features"], features])
+    model["coords"] = np.vstack([model["coords"], coords])
+    model["ids"] = [*model["ids"], *papers["ids"]]
+    if "domains" in model:
+        model["domains"] = [*model["domains"], *papers["domain"]]
+
+
+def _measure(fn, *args) -> tuple[object, float, float]:
+    """fn(*args)를 실행하고 (결과, 소요 초, 최대 할당 MiB)를 반환합니다."""
+    tracemalloc.start()
+    start = time.monotonic()
+    try:
+        result = fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, time.monotonic() - start, peak / (1 << 20)
+
+
+def compare_pipelines(
+    papers: dict,
+    svd_components: int = SVD_COMPONENTS,
+    cache: VectorCache | None = None,
+    workers: int = 1,
+) -> list[dict]:
+    """밀집 변환 경로와 SVD 경로의 시간/최대 메모리를 비교합니다.
+
+    TF-IDF는 한 번만 계산하고, 각 경로의 축소 + t-SNE 구간만 측정합니다.
+    메모리는 tracemalloc 기준(numpy 버퍼 포함)의 최대 할당량입니다.
+    """
+    _, tfidf_matrix = vectorize_papers(papers, cache, workers)
+    rows = []
+    for label, components in (("dense", 0), (f"svd-{svd_components}", svd_components)):
+        print(f"\n  [{label}]")
+        (_, features), reduce_s, reduce_mib = _measure(reduce_features, tfidf_matrix, components)
+        _, tsne_s, tsne_mib = _measure(run_tsne, features)
+        rows.append({
+            "pipeline": label,
+            "features_mib": features.nbytes / (1 << 20),
+            "reduce_s": reduce_s,
+            "tsne_s": tsne_s,
+            "peak_mib": max(reduce_mib, tsne_mib + features.nbytes / (1 << 20)),
+        })
+        del features
+    return rows
+
+
 def normalize_coords(coords: np.ndarray) -> np.ndarray:
     """좌표를 0~100 범위로 정규화합니다."""
     for dim in range(coords.shape[1]):
@@ -153,106 +551,307 @@ def normalize_coords(coords: np.ndarray) -> np.ndarray:
     return coords
 
 
-def bulk_update_coords(papers: list[dict], coords: np.ndarray) -> dict:
-    """ES _bulk API로 viz_x, viz_y 좌표를 업데이트합니다."""
-    total_updated = 0
-    total_errors = 0
-
-    for chunk_start in range(0, len(papers), BULK_CHUNK_SIZE):
-        chunk_end = min(chunk_start + BULK_CHUNK_SIZE, len(papers))
-        lines = []
-
-        for i in range(chunk_start, chunk_end):
-            doc_id = papers[i]["_id"]
-            viz_x = round(float(coords[i, 0]), 2)
-            viz_y = round(float(coords[i, 1]), 2)
-            lines.append(json.dumps({"update": {"_index": INDEX, "_id": doc_id}}))
-            lines.append(json.dumps({"doc": {"viz_x": viz_x, "viz_y": viz_y}}))
-
-        body = "\n".join(lines) + "\n"
-
-        backoff = 5
-        for attempt in range(5):
-            try:
-                resp = requests.post(
-                    f"{ES_URL}/_bulk",
-                    headers={
-                        "Content-Type": "application/x-ndjson",
-                        "Authorization": f"ApiKey {ES_API_KEY}",
-                    },
-                    data=body.encode("utf-8"),
-                    timeout=120,
-                )
-                if resp.status_code == 200:
-                    result = resp.json()
-                    errors = sum(
-                        1
-                        for item in result.get("items", [])
-                        if item.get("update", {}).get("error")
-                    )
-                    updated = (chunk_end - chunk_start) - errors
-                    total_updated += updated
-                    total_errors += errors
-                    print(
-                        f"  Updated {chunk_end}/{len(papers)} "
-                        f"(chunk: {updated} ok, {errors} errors)"
-                    )
-                    break
-                else:
-                    print(f"  Bulk update failed ({resp.status_code}), attempt {attempt + 1}/5")
-                    import time
-                    time.sleep(backoff)
-                    backoff = min(backoff * 2, 120)
-            except Exception as e:
-                print(f"  Bulk update error: {e}, attempt {attempt + 1}/5")
-                import time
-                time.sleep(backoff)
-                backoff = min(backoff * 2, 120)
+def bulk_update_coords(papers: dict, coords: np.ndarray, only_changed: bool = True) -> dict:
+    """ES _bulk API로 viz_x, viz_y 좌표를 업데이트합니다.
+
+    only_changed면 소수 둘째 자리로 반올림한 좌표가 papers의 기존 viz_x/viz_y와
+    같은 논문은 건너뜁니다(부분 업데이트도 ES에서는 문서 재색인이므로).
+    배치 크기 조절, 거부 항목 재시도, gzip 전송(ES_BULK_GZIP), 동시 요청 수
+    (ES_BULK_CONCURRENCY)는 BulkIndexer가 담당합니다.
+    """
+    rounded = np.round(coords, 2)
+    changed = np.ones(len(papers["ids"]), dtype=bool)
+    if only_changed:
+        previous = np.round(np.column_stack([papers["viz_x"], papers["viz_y"]]), 2)
+        # NaN(좌표 없음)은 어떤 값과도 같지 않으므로 새 논문은 항상 포함됩니다
+        changed = (rounded != previous).any(axis=1)
+
+    indexer = BulkIndexer()
+
+    for i in np.flatnonzero(changed):
+        viz_x = float(rounded[i, 0])
+        viz_y = float(rounded[i, 1])
+        indexer.add(
+            {"update": {"_index": INDEX, "_id": papers["ids"][i]}},
+            {"doc": {"viz_x": viz_x, "viz_y": viz_y}},
+        )
+    indexer.close()
+
+    return {
+        "updated": indexer.stats["ok"],
+        "errors": indexer.stats["errors"],
+        "skipped": int((~changed).sum()),
+    }
+
+
+def grid_aggregates(coords: np.ndarray, domains: list[str], levels=GRID_LEVELS) -> list[dict]:
+    """정규화된 좌표를 해상도별 격자로 묶어 셀×도메인 집계 문서를 만듭니다.
+
+    각 문서는 한 해상도(level = 축당 셀 수)의 한 셀에서 한 도메인의 논문 수와
+    그 셀 안에서의 비율(share)을 담습니다. 빈 셀은 만들지 않습니다.
+    """
+    names, domain_codes = np.unique(np.asarray(domains), return_inverse=True)
+    generated_at = datetime.now(timezone.utc).isoformat()
+    docs = []
+    for level in levels:
+        size = 100 / level
+        cells = np.clip((coords / size).astype(np.int64), 0, level - 1)
+        cell_ids = cells[:, 0] * level + cells[:, 1]
+        totals = np.bincount(cell_ids, minlength=level * level)
+        counts = np.bincount(cell_ids * len(names) + domain_codes,
+                             minlength=level * level * len(names))
+        for key in np.flatnonzero(counts):
+            cell_id, domain = divmod(int(key), len(names))
+            cell_x, cell_y = divmod(cell_id, level)
+            docs.append({
+                "level": level,
+                "cell_size": size,
+                "cell_x": cell_x,
+                "cell_y": cell_y,
+                "x": round((cell_x + 0.5) * size, 2),
+                "y": round((cell_y + 0.5) * size, 2),
+                "domain": str(names[domain]),
+                "count": int(counts[key]),
+                "share": round(int(counts[key]) / int(totals[cell_id]), 4),
+                "generated_at": generated_at,
+            })
+    return docs
+
+
+def write_grid_aggregates(docs: list[dict]) -> dict:
+    """격자 집계를 GRID_INDEX에 쓰고, 이번 실행에 없는(비워진) 셀은 지웁니다.
+
+    _id는 해상도/셀/도메인으로 정해지므로 같은 셀은 덮어쓰고, 그 뒤
+    generated_at이 이번 실행보다 이른 문서를 _delete_by_query로 정리합니다.
+    """
+    indexer = BulkIndexer()
+    for doc in docs:
+        doc_id = f"{doc['level']}-{doc['cell_x']}-{doc['cell_y']}-{doc['domain']}"
+        indexer.add({"index": {"_index": GRID_INDEX, "_id": doc_id}}, doc)
+    indexer.close()
+
+    deleted = 0
+    if docs and not indexer.stats["errors"]:
+        es_request("POST", f"/{GRID_INDEX}/_refresh", timeout=60)
+        resp = es_request(
+            "POST", f"/{GRID_INDEX}/_delete_by_query",
+            params={"conflicts": "proceed", "refresh": "true"},
+            json={"query": {"range": {"generated_at": {"lt": docs[0]["generated_at"]}}}},
+            timeout=120,
+        )
+        if resp.ok:
+            deleted = resp.json().get("deleted", 0)
         else:
-            print(f"  GAVE UP on chunk {chunk_start}-{chunk_end}")
-            total_errors += chunk_end - chunk_start
+            print(f"  Stale cell cleanup failed ({resp.status_code})")
+
+    return {"cells": indexer.stats["ok"], "errors": indexer.stats["errors"], "deleted": deleted}
+
+
+def update_grid(coords: np.ndarray, domains: list[str]) -> None:
+    docs = grid_aggregates(coords, domains)
+    result = write_grid_aggregates(docs)
+    print(f"  Grid cells written: {result['cells']} "
+          f"(levels {', '.join(map(str, GRID_LEVELS))}), "
+          f"{result['deleted']} stale removed, {result['errors']} errors")
+
+
+def run_incremental(
+    slices: int = EXPORT_SLICES,
+    snapshot: PaperSnapshot | None = None,
+    grid: bool = True,
+):
+    """새 논문(viz_x 없음)만 저장된 지도에 배치하고 업데이트합니다."""
+    print("=" * 60)
+    print("Terra Incognita — Incremental Visualization")
+    print(f"ES_URL: {ES_URL}")
+    print("=" * 60)
+
+    model = load_viz_model()
+    if model is None:
+        print(f"ERROR: No viz model at {_viz_model_path()}; run a full pass first")
+        sys.exit(1)
+    print(f"  Reference map: {len(model['ids'])} papers")
+
+    print("\n[Step 1] Fetching papers without viz coordinates...")
+    if snapshot is not None:
+        papers = load_snapshot_papers(snapshot, slices)
+        papers = select_papers(papers, np.isnan(papers["viz_x"]))
+    else:
+        papers = fetch_all_papers({"bool": {"must_not": [{"exists": {"field": "viz_x"}}]}}, slices)
+    print(f"  New papers: {len(papers['ids'])}")
+    if not papers["ids"]:
+        return
+
+    print(f"\n[Step 2] Projecting onto the map (k={KNN_NEIGHBORS})...")
+    coords, features = project_new_papers(model, papers)
+
+    print("\n[Step 3] Updating ES with viz coordinates...")
+    result = bulk_update_coords(papers, coords)
+    if snapshot is not None:
+        snapshot.set_coords(papers["ids"], *np.round(coords, 2).T)
 
-    return {"updated": total_updated, "errors": total_errors}
+    extend_viz_model(model, papers, features, coords.astype(np.float32))
+    save_viz_model(model)
+
+    # 격자는 전체 좌표가 필요하므로 모델의 기준 좌표(새 논문 포함)로 다시 집계
+    if grid and "domains" in model:
+        print("\n[Step 4] Updating landscape grid aggregates...")
+        update_grid(model["coords"], model["domains"])
+
+    print("\n" + "=" * 60)
+    print("Incremental Visualization Complete")
+    print("=" * 60)
+    print(f"  Papers placed: {len(papers['ids'])}")
+    print(f"  Updated: {result['updated']}")
+    print(f"  Unchanged (skipped): {result['skipped']}")
+    print(f"  Errors: {result['errors']}")
+    conn = transport_stats()
+    print(f"  ES connections: {conn['opened']} opened, {conn['reused']} reused")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Terra Incognita viz coordinate generator")
+    parser.add_argument("--svd-components", type=int, default=SVD_COMPONENTS,
+                        help="TruncatedSVD dimensions before t-SNE; 0 densifies the "
+                             f"full TF-IDF matrix as before (default: {SVD_COMPONENTS})")
+    parser.add_argument("--compare", action="store_true",
+                        help="Time and measure peak memory of the dense and SVD "
+                             "pipelines, then exit without updating ES")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Place only papers without viz_x/viz_y onto the saved map "
+                             "by kNN interpolation instead of re-running t-SNE")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="Initialize t-SNE from the stored viz_x/viz_y instead of PCA, "
+                             f"stop early on convergence (<= {WARM_MAX_ITER} iterations) and "
+                             "align the result to the previous map")
+    parser.add_argument("--tokenize-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for tokenizing papers missing from the vector "
+                             "cache (default: CPU count)")
+    parser.add_argument("--no-vector-cache", action="store_true",
+                        help=f"Tokenize every paper without reading or writing "
+                             f"{VECTOR_CACHE_DIR}/ under the state directory")
+    parser.add_argument("--export-slices", type=int, default=EXPORT_SLICES,
+                        help=f"Parallel PIT slices when reading papers (default: {EXPORT_SLICES})")
+    parser.add_argument("--from-snapshot", type=Path, nargs="?", const=DEFAULT_SNAPSHOT_DIR,
+                        metavar="DIR",
+                        help="Read papers from a local paper_snapshot.py snapshot instead of "
+                             f"exporting from ES (default dir: {DEFAULT_SNAPSHOT_DIR})")
+    parser.add_argument("--write-all", action="store_true",
+                        help="Send an update for every paper, not only those whose rounded "
+                             "viz_x/viz_y changed")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="Layout engine: exact t-SNE, Barnes-Hut t-SNE, t-SNE on an "
+                             "approximate kNN graph (pynndescent if installed), or UMAP "
+                             f"(needs umap-learn) (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="Parallel jobs for neighbour search in the layout engines "
+                             "(default: -1, all cores)")
+    parser.add_argument("--quality-report", action="store_true",
+                        help=f"After the layout, print trustworthiness and kNN preservation "
+                             f"on a {QUALITY_SAMPLE}-paper sample")
+    parser.add_argument("--benchmark-engines", nargs="+", choices=ENGINES, metavar="ENGINE",
+                        help="Time each engine and report its layout quality, then exit "
+                             "without updating ES")
+    parser.add_argument("--no-grid", action="store_true",
+                        help=f"Skip writing the multi-resolution density grid to {GRID_INDEX}")
+    args = parser.parse_args()
+
+    snapshot = PaperSnapshot(args.from_snapshot) if args.from_snapshot else None
+    if snapshot is not None and not len(snapshot):
+        print(f"ERROR: Snapshot {snapshot.root} is empty; run paper_snapshot.py sync first")
+        sys.exit(1)
+
+    if args.incremental:
+        run_incremental(args.export_slices, snapshot, not args.no_grid)
+        return
+
     print("=" * 60)
     print("Terra Incognita — Vector Space Visualization")
     print(f"ES_URL: {ES_URL}")
     print("=" * 60)
 
     # Step 1: Fetch all papers
-    print("\n[Step 1] Fetching papers from ES...")
-    papers = fetch_all_papers()
-    print(f"  Total papers: {len(papers)}")
-
-    if len(papers) < 10:
+    if snapshot is not None:
+        print("\n[Step 1] Loading papers from local snapshot...")
+        papers = load_snapshot_papers(snapshot, args.export_slices)
+    else:
+        print("\n[Step 1] Fetching papers from ES...")
+        papers = fetch_all_papers(slices=args.export_slices)
+    print(f"  Total papers: {len(papers['ids'])}")
+
+    if len(papers["ids"]) < 10:
         print("ERROR: Not enough papers for t-SNE (need at least 10)")
         sys.exit(1)
 
+    cache = VectorCache(None if args.no_vector_cache else _state_dir() / VECTOR_CACHE_DIR)
+
+    if args.compare:
+        print("\n[Step 2] Comparing dense vs. SVD pipelines...")
+        rows = compare_pipelines(papers, args.svd_components or SVD_COMPONENTS,
+                                 cache, args.tokenize_workers)
+        cache.save()
+        print(f"\n  {'pipeline':<10} {'t-SNE input':>12} {'reduce':>8} {'t-SNE':>8} {'peak':>10}")
+        for row in rows:
+            print(f"  {row['pipeline']:<10} {row['features_mib']:>9.1f} MiB "
+                  f"{row['reduce_s']:>7.1f}s {row['tsne_s']:>7.1f}s {row['peak_mib']:>6.1f} MiB")
+        return
+
+    if args.benchmark_engines:
+        print("\n[Step 2] Benchmarking layout engines...")
+        _, tfidf_matrix = vectorize_papers(papers, cache, args.tokenize_workers)
+        cache.save()
+        _, features = reduce_features(tfidf_matrix, args.svd_components)
+        rows = benchmark_engines(features, args.benchmark_engines, args.n_jobs)
+        print(f"\n  {'engine':<12} {'time':>8} {'trust':>7} {'kNN kept':>9}")
+        for row in rows:
+            print(f"  {row['engine']:<12} {row['seconds']:>7.1f}s "
+                  f"{row['trustworthiness']:>7.3f} {row['knn_preservation']:>8.1%}")
+        print(f"  (sample={rows[0]['sample']}, k={rows[0]['k']})")
+        return
+
     # Step 2: Compute 2D coordinates
     print("\n[Step 2] Computing 2D coordinates...")
-    coords = compute_2d_coords(papers)
+    coords, model = compute_2d_coords(papers, args.svd_components, args.warm_start,
+                                      cache, args.tokenize_workers, args.engine, args.n_jobs)
+    cache.save()
+    if args.quality_report:
+        quality = layout_quality(model["features"], coords, args.n_jobs)
+        print(f"  Layout quality (sample={quality['sample']}, k={quality['k']}): "
+              f"trustworthiness {quality['trustworthiness']:.3f}, "
+              f"kNN preserved {quality['knn_preservation']:.1%}")
 
     # Step 3: Normalize to 0-100 range
     print("\n[Step 3] Normalizing coordinates to 0-100 range...")
     coords = normalize_coords(coords)
+    model["coords"] = coords.astype(np.float32)
+    model["ids"] = list(papers["ids"])
+    model["domains"] = list(papers["domain"])
+    print(f"  Saved viz model: {save_viz_model(model)}")
 
     # Step 4: Update ES with coordinates
     print("\n[Step 4] Updating ES with viz coordinates...")
-    result = bulk_update_coords(papers, coords)
+    result = bulk_update_coords(papers, coords, only_changed=not args.write_all)
+    if snapshot is not None:
+        snapshot.set_coords(papers["ids"], *np.round(coords, 2).T)
+
+    # Step 5: Density grid for the dashboard
+    if not args.no_grid:
+        print("\n[Step 5] Writing landscape grid aggregates...")
+        update_grid(coords, papers["domain"])
 
     print("\n" + "=" * 60)
     print("Visualization Complete")
     print("=" * 60)
-    print(f"  Papers processed: {len(papers)}")
+    print(f"  Papers processed: {len(papers['ids'])}")
     print(f"  Updated: {result['updated']}")
+    print(f"  Unchanged (skipped): {result['skipped']}")
     print(f"  Errors: {result['errors']}")
+    conn = transport_stats()
+    print(f"  ES connections: {conn['opened']} opened, {conn['reused']} reused")
 
     # Print domain distribution
     domain_counts: dict[str, int] = {}
-    for p in papers:
-        domain = p.get("_source", {}).get("domain", "unknown")
+    for domain in papers["domain"]:
         domain_counts[domain] = domain_counts.get(domain, 0) + 1
     print("\n  Domain distribution:")
     for domain, count in sorted(domain_counts.items()):
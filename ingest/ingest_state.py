@@ -0,0 +1,182 @@
+"""Terra Incognita ingest checkpoint.
+
+Persistent state shared by arxiv_collector.py and the MCP server's
+ti_ingest_new (server.py keeps a copy of the read/merge/write helpers because
+its image only ships server.py; keep the two in sync).
+
+Layout under TI_STATE_DIR (default: ingest/.state), one directory per index:
+
+  <index>/watermarks.json   {"<scope>": {"<domain>": "<newest published ISO>"}}
+  <index>/seen_ids.txt      arxiv_ids already indexed, one per line: a sorted
+                            block followed by IDs appended since the last compaction
+
+scope is "recent" for the default run and "before_<year>" for backtests.
+save() rewrites the small watermarks file and appends new IDs; save(compact=True)
+merges with whatever is on disk (union of IDs, max of watermarks) and replaces
+the sorted ID file atomically, so both entry points can share one directory.
+In memory, known IDs live in KnownIds, a sorted fixed-width byte buffer.
+"""
+
+import heapq
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_STATE_DIR = Path(__file__).parent / ".state"
+WATERMARKS_FILE = "watermarks.json"
+SEEN_IDS_FILE = "seen_ids.txt"
+
+
+def _read_watermarks(path: Path) -> dict[str, dict[str, str]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def _read_ids(path: Path) -> list[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+ID_WIDTH = 24  # Bytes per stored arxiv_id; new-style IDs are 10, old-style up to ~17
+
+
+class KnownIds:
+    """Set of arxiv_ids stored as one sorted buffer of fixed-width records.
+
+    Lookups are a binary search over the buffer, about ID_WIDTH bytes per ID
+    instead of a str object and hash slot each. IDs added since the last
+    compact() (and the rare ID longer than ID_WIDTH) are kept in a small set.
+    """
+
+    def __init__(self, ids=()):
+        self._blob = b""
+        self._added: set[str] = set()
+        self.update(ids)
+        self.compact()
+
+    @staticmethod
+    def _key(arxiv_id: str) -> bytes | None:
+        raw = arxiv_id.encode("utf-8")
+        return raw.ljust(ID_WIDTH, b"\0") if len(raw) <= ID_WIDTH else None
+
+    def _records(self):
+        for start in range(0, len(self._blob), ID_WIDTH):
+            yield self._blob[start:start + ID_WIDTH]
+
+    def _in_blob(self, key: bytes) -> bool:
+        lo, hi = 0, len(self._blob) // ID_WIDTH
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = self._blob[mid * ID_WIDTH:(mid + 1) * ID_WIDTH]
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __contains__(self, arxiv_id: str) -> bool:
+        if arxiv_id in self._added:
+            return True
+        key = self._key(arxiv_id)
+        return key is not None and self._in_blob(key)
+
+    def __len__(self) -> int:
+        return len(self._blob) // ID_WIDTH + len(self._added)
+
+    def __iter__(self):
+        """IDs in sorted order."""
+        # NUL padding sorts before any character, so record order is string order
+        stored = (record.rstrip(b"\0").decode("utf-8") for record in self._records())
+        return heapq.merge(stored, sorted(self._added))
+
+    def add(self, arxiv_id: str) -> bool:
+        """Add an ID; returns False if it was already known."""
+        if arxiv_id in self:
+            return False
+        self._added.add(arxiv_id)
+        return True
+
+    def update(self, arxiv_ids) -> None:
+        for arxiv_id in arxiv_ids:
+            self.add(arxiv_id)
+
+    def compact(self) -> None:
+        """Merge the added IDs into the sorted buffer."""
+        keys = sorted(k for k in map(self._key, self._added) if k is not None)
+        if not keys:
+            return
+        self._blob = b"".join(heapq.merge(self._records(), keys))
+        self._added = {arxiv_id for arxiv_id in self._added if self._key(arxiv_id) is None}
+
+
+class IngestCheckpoint:
+    """Per-domain high-watermarks plus the set of arxiv_ids already indexed."""
+
+    def __init__(self, index_name: str, scope: str, state_dir: Path | None = None):
+        if state_dir is None:
+            state_dir = os.getenv("TI_STATE_DIR") or DEFAULT_STATE_DIR
+        self.path = Path(state_dir) / index_name
+        self.scope = scope
+        self.watermarks = _read_watermarks(self.path / WATERMARKS_FILE)
+        self.known_ids = KnownIds(_read_ids(self.path / SEEN_IDS_FILE))
+        self._unsaved: list[str] = []  # IDs added since the last save()
+
+    def watermark(self, domain: str) -> datetime | None:
+        """Newest published timestamp indexed for domain, or None."""
+        value = self.watermarks.get(self.scope, {}).get(domain)
+        return datetime.fromisoformat(value) if value else None
+
+    def advance(self, domain: str, published: str) -> None:
+        """Move domain's watermark forward to published (never backwards)."""
+        current = self.watermark(domain)
+        if current is None or datetime.fromisoformat(published) > current:
+            self.watermarks.setdefault(self.scope, {})[domain] = published
+
+    def add_ids(self, arxiv_ids) -> None:
+        self._unsaved.extend(arxiv_id for arxiv_id in arxiv_ids if self.known_ids.add(arxiv_id))
+
+    def save(self, compact: bool = False) -> None:
+        """Write watermarks and append new IDs; compact also merges and re-sorts the ID file.
+
+        Cheap enough to call per batch; compact at domain boundaries and at the
+        end of a run.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        on_disk = _read_watermarks(self.path / WATERMARKS_FILE)
+        for scope, domains in on_disk.items():
+            for domain, published in domains.items():
+                mine = self.watermarks.setdefault(scope, {}).get(domain)
+                if mine is None or datetime.fromisoformat(published) > datetime.fromisoformat(mine):
+                    self.watermarks[scope][domain] = published
+        _atomic_write(self.path / WATERMARKS_FILE,
+                      json.dumps(self.watermarks, indent=2, sort_keys=True) + "\n")
+
+        if not compact:
+            if self._unsaved:
+                with open(self.path / SEEN_IDS_FILE, "a", encoding="utf-8") as f:
+                    f.writelines(f"{arxiv_id}\n" for arxiv_id in self._unsaved)
+            self._unsaved = []
+            return
+
+        self.known_ids.update(_read_ids(self.path / SEEN_IDS_FILE))
+        self.known_ids.compact()
+        tmp = self.path / f"{SEEN_IDS_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(f"{arxiv_id}\n" for arxiv_id in self.known_ids)
+        os.replace(tmp, self.path / SEEN_IDS_FILE)
+        self._unsaved = []
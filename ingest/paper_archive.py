@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Terra Incognita segmented paper archive.
+
+A local, append-only store of bulk-format paper records (action line + source
+line, as written to papers.ndjson), laid out for random access and per-domain
+scans instead of one plain-text file:
+
+  <root>/<domain>/00000.ndjson.gz   Segments of independently gzipped blocks
+  <root>/offsets.tsv                arxiv_id → domain, segment, block offset,
+                                    block length, record number in the block
+
+Records are buffered per domain and written as ~64 KiB gzip members, so a
+segment is still a valid .gz file (zcat works) while a single paper can be
+read by decompressing one block. A segment rolls over at 64 MiB. offsets.tsv
+is append-only; when a paper is archived again the last entry wins.
+
+Usage:
+  python3 paper_archive.py archive/papers stats
+  python3 paper_archive.py archive/papers get 2401.12345
+  python3 paper_archive.py archive/papers cat neuroscience > neuroscience.ndjson
+"""
+
+import gzip
+import json
+import sys
+from pathlib import Path
+
+BLOCK_BYTES = 64 << 10      # Uncompressed records per gzip member
+SEGMENT_BYTES = 64 << 20    # Compressed bytes per segment file
+OFFSETS_FILE = "offsets.tsv"
+
+
+class PaperArchive:
+    """Per-domain compressed segments with an arxiv_id offset index."""
+
+    def __init__(self, root: str | Path, block_bytes: int = BLOCK_BYTES,
+                 segment_bytes: int = SEGMENT_BYTES):
+        self.root = Path(root)
+        self.block_bytes = block_bytes
+        self.segment_bytes = segment_bytes
+        self._offsets: dict[str, tuple[str, str, int, int, int]] | None = None
+        self._pending: dict[str, list[tuple[str, bytes]]] = {}
+        self._pending_bytes: dict[str, int] = {}
+
+    # ─── Index ───────────────────────────────────────────────────
+
+    @property
+    def offsets(self) -> dict[str, tuple[str, str, int, int, int]]:
+        """arxiv_id → (domain, segment, block offset, block length, record no)."""
+        if self._offsets is None:
+            self._offsets = {}
+            try:
+                with open(self.root / OFFSETS_FILE, encoding="utf-8") as f:
+                    for line in f:
+                        arxiv_id, domain, segment, offset, length, n = line.rstrip("\n").split("\t")
+                        self._offsets[arxiv_id] = (domain, segment, int(offset), int(length), int(n))
+            except FileNotFoundError:
+                pass
+        return self._offsets
+
+    def __contains__(self, arxiv_id: str) -> bool:
+        return arxiv_id in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def domains(self) -> list[str]:
+        return sorted({entry[0] for entry in self.offsets.values()})
+
+    # ─── Write ───────────────────────────────────────────────────
+
+    def append(self, arxiv_id: str, domain: str, record: bytes) -> None:
+        """Buffer one action+source record; writes a block once enough is pending."""
+        self._pending.setdefault(domain, []).append((arxiv_id, record))
+        self._pending_bytes[domain] = self._pending_bytes.get(domain, 0) + len(record)
+        if self._pending_bytes[domain] >= self.block_bytes:
+            self._write_block(domain)
+
+    def flush(self) -> None:
+        for domain in list(self._pending):
+            self._write_block(domain)
+
+    def close(self) -> None:
+        self.flush()
+
+    def _current_segment(self, domain: str) -> Path:
+        domain_dir = self.root / domain
+        domain_dir.mkdir(parents=True, exist_ok=True)
+        segments = sorted(domain_dir.glob("*.ndjson.gz"))
+        if segments and segments[-1].stat().st_size < self.segment_bytes:
+            return segments[-1]
+        return domain_dir / f"{len(segments):05d}.ndjson.gz"
+
+    def _write_block(self, domain: str) -> None:
+        records = self._pending.pop(domain, [])
+        self._pending_bytes.pop(domain, None)
+        if not records:
+            return
+
+        block = gzip.compress(b"".join(record for _, record in records))
+        segment = self._current_segment(domain)
+        with open(segment, "ab") as f:
+            offset = f.tell()
+            f.write(block)
+
+        # Index lines go out only after the block is on disk
+        segment_name = segment.name
+        lines = []
+        for n, (arxiv_id, _) in enumerate(records):
+            entry = (domain, segment_name, offset, len(block), n)
+            self.offsets[arxiv_id] = entry
+            lines.append("\t".join([arxiv_id, *map(str, entry)]) + "\n")
+        with open(self.root / OFFSETS_FILE, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    # ─── Read ────────────────────────────────────────────────────
+
+    def _read_block(self, domain: str, segment: str, offset: int, length: int) -> list[bytes]:
+        with open(self.root / domain / segment, "rb") as f:
+            f.seek(offset)
+            return gzip.decompress(f.read(length)).splitlines(keepends=True)
+
+    def get_record(self, arxiv_id: str) -> tuple[bytes, bytes] | None:
+        """(action_line, source_line) for one paper, decompressing a single block."""
+        entry = self.offsets.get(arxiv_id)
+        if entry is None:
+            return None
+        domain, segment, offset, length, n = entry
+        lines = self._read_block(domain, segment, offset, length)
+        return lines[2 * n], lines[2 * n + 1]
+
+    def get(self, arxiv_id: str) -> dict | None:
+        record = self.get_record(arxiv_id)
+        return json.loads(record[1]) if record else None
+
+    def iter_records(self, domain: str):
+        """Yield (action_line, source_line) for the current version of each paper in domain.
+
+        Blocks are read in write order, each decompressed once; records that
+        were superseded by a later append are skipped.
+        """
+        blocks: dict[tuple[str, int, int], set[int]] = {}
+        for entry in self.offsets.values():
+            if entry[0] == domain:
+                _, segment, offset, length, n = entry
+                blocks.setdefault((segment, offset, length), set()).add(n)
+
+        for (segment, offset, length), live in sorted(blocks.items()):
+            lines = self._read_block(domain, segment, offset, length)
+            for n in sorted(live):
+                yield lines[2 * n], lines[2 * n + 1]
+
+    def iter_docs(self, domain: str | None = None):
+        """Yield source docs for one domain, or for every domain."""
+        for name in [domain] if domain else self.domains():
+            for _, source_line in self.iter_records(name):
+                yield json.loads(source_line)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[2] not in ("stats", "get", "cat"):
+        print(__doc__.split("Usage:")[1])
+        sys.exit(1)
+
+    archive = PaperArchive(sys.argv[1])
+    command = sys.argv[2]
+
+    if command == "stats":
+        counts: dict[str, int] = {}
+        for domain, *_ in archive.offsets.values():
+            counts[domain] = counts.get(domain, 0) + 1
+        for domain, count in sorted(counts.items()):
+            print(f"{domain}: {count}")
+        print(f"Total: {len(archive)}")
+    elif command == "get":
+        doc = archive.get(sys.argv[3])
+        if doc is None:
+            print(f"Not found: {sys.argv[3]}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(doc, ensure_ascii=False, indent=2))
+    elif command == "cat":
+        out = sys.stdout.buffer
+        for action_line, source_line in archive.iter_records(sys.argv[3]):
+            out.write(action_line + source_line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Terra Incognita local columnar snapshot of ti-papers.
+
+Analytics jobs (generate_viz_coords.py, offline scoring) read the corpus from
+this snapshot instead of paging the whole index over HTTP. Every column is a
+separate file that can be memory-mapped, Arrow-style:
+
+  <root>/meta.json                  rows, indexed_at watermark, last sync time
+  <root>/<column>.npy               fixed-width columns (published, viz_x, viz_y)
+  <root>/<column>.offsets.npy       string columns: int64 offsets (rows + 1)
+  <root>/<column>.data.npy          string columns: concatenated UTF-8 bytes
+
+categories is stored as one space-separated string per paper. sync pulls
+only papers (re)indexed since the last indexed_at watermark, which the
+ti-papers default ingest pipeline stamps on every index operation, so
+backfills and reindexes are picked up whatever their published date.
+Unchanged rows are copied as raw column bytes, and an ID-only pass drops
+papers deleted from the index. --coords re-reads just viz_x/viz_y for every
+paper; those change on each viz run through updates, which don't touch
+indexed_at.
+
+Usage:
+  python3 paper_snapshot.py sync             # Incremental (full on first run)
+  python3 paper_snapshot.py sync --full      # Rebuild from scratch
+  python3 paper_snapshot.py sync --coords    # Refresh viz_x/viz_y only
+  python3 paper_snapshot.py stats
+"""
+
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from es_export import EXPORT_SLICES, export_columns
+from es_transport import es_request
+
+DEFAULT_INDEX = "ti-papers"
+DEFAULT_SNAPSHOT_DIR = Path(__file__).parent / ".snapshot" / DEFAULT_INDEX
+META_FILE = "meta.json"
+INDEXED_FIELD = "indexed_at"          # Set by the ti-papers-indexed-at ingest pipeline
+REFRESH_OVERLAP = timedelta(minutes=10)  # Bulk requests still in flight at the last sync
+
+STRING_COLUMNS = ("arxiv_id", "domain", "primary_category", "categories", "title", "content")
+FLOAT_COLUMNS = ("viz_x", "viz_y")
+SOURCE_FIELDS = [*STRING_COLUMNS, "published", *FLOAT_COLUMNS]
+
+
+def _parse_date(value: str | None) -> np.datetime64:
+    if not value:
+        return np.datetime64("NaT", "ms")
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(dt, "ms")
+
+
+def _source_value(src: dict, field: str):
+    value = src.get(field)
+    if field == "categories" and isinstance(value, list):
+        return " ".join(value)
+    return value
+
+
+def _load(path: Path, mode: str = "r") -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode=mode)
+    except ValueError:  # Zero-length arrays can't be mapped
+        return np.load(path)
+
+
+def _encode_strings(values) -> tuple[np.ndarray, np.ndarray]:
+    """(offsets, data) arrays for a list of strings."""
+    encoded = [(value or "").encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _take_strings(offsets: np.ndarray, data: np.ndarray,
+                  rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The given rows of a string column, copied as bytes without decoding."""
+    starts = np.asarray(offsets[rows], dtype=np.int64)
+    lengths = np.asarray(offsets[rows + 1], dtype=np.int64) - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return new_offsets, np.asarray(data[positions], dtype=np.uint8)
+
+
+def _take_rows(arrays: dict, rows: np.ndarray) -> dict:
+    return {name: _take_strings(*value, rows) if name in STRING_COLUMNS else value[rows]
+            for name, value in arrays.items()}
+
+
+def _concat_rows(head: dict, tail: dict) -> dict:
+    arrays = {}
+    for name, value in head.items():
+        if name in STRING_COLUMNS:
+            (head_offsets, head_data), (tail_offsets, tail_data) = value, tail[name]
+            arrays[name] = (np.concatenate([head_offsets[:-1], tail_offsets + head_offsets[-1]]),
+                            np.concatenate([head_data, tail_data]))
+        else:
+            arrays[name] = np.concatenate([value, tail[name]])
+    return arrays
+
+
+def _to_arrays(columns: dict[str, list]) -> dict:
+    arrays = {name: _encode_strings(columns[name]) for name in STRING_COLUMNS}
+    arrays["published"] = np.array(columns["published"], dtype="datetime64[ms]")
+    for name in FLOAT_COLUMNS:
+        arrays[name] = np.array([np.nan if v is None else v for v in columns[name]],
+                                dtype=np.float32)
+    return arrays
+
+
+class StringColumn:
+    """Read-only view of a string column over memory-mapped offsets and bytes."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class PaperSnapshot:
+    """Columnar on-disk copy of the papers index."""
+
+    def __init__(self, root: str | Path = DEFAULT_SNAPSHOT_DIR):
+        self.root = Path(root)
+        try:
+            self.meta = json.loads((self.root / META_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self.meta = {"rows": 0, "watermark": None, "synced_at": None}
+
+    def __len__(self) -> int:
+        return self.meta["rows"]
+
+    def column(self, name: str):
+        """Memory-mapped column: ndarray for fixed-width, StringColumn for strings."""
+        if name in STRING_COLUMNS:
+            return StringColumn(_load(self.root / f"{name}.offsets.npy"),
+                                _load(self.root / f"{name}.data.npy"))
+        return _load(self.root / f"{name}.npy")
+
+    # ─── Write ───────────────────────────────────────────────────
+
+    def _arrays(self) -> dict:
+        """Every column as stored: (offsets, data) for strings, ndarray otherwise."""
+        arrays = {name: (_load(self.root / f"{name}.offsets.npy"), _load(self.root / f"{name}.data.npy"))
+                  for name in STRING_COLUMNS}
+        for name in ("published", *FLOAT_COLUMNS):
+            arrays[name] = _load(self.root / f"{name}.npy")
+        return arrays
+
+    def _write_meta(self, root: Path, rows: int, watermark: str | None) -> None:
+        self.meta = {
+            "rows": rows,
+            "watermark": watermark,
+            "watermark_field": INDEXED_FIELD,
+            "synced_at": datetime.now(timezone.utc).isoformat(),
+        }
+        (root / META_FILE).write_text(json.dumps(self.meta, indent=2) + "\n", encoding="utf-8")
+
+    def _write(self, arrays: dict, watermark: str | None) -> None:
+        """Write every column to a fresh directory, then swap it in."""
+        tmp = self.root.with_name(f"{self.root.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        for name in STRING_COLUMNS:
+            offsets, data = arrays[name]
+            np.save(tmp / f"{name}.offsets.npy", offsets)
+            np.save(tmp / f"{name}.data.npy", data)
+        for name in ("published", *FLOAT_COLUMNS):
+            np.save(tmp / f"{name}.npy", arrays[name])
+        self._write_meta(tmp, len(arrays["published"]), watermark)
+
+        old = self.root.with_name(f"{self.root.name}.{os.getpid()}.old")
+        if self.root.exists():
+            os.replace(self.root, old)
+        os.replace(tmp, self.root)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def sync(self, index: str = DEFAULT_INDEX, full: bool = False,
+             slices: int = EXPORT_SLICES) -> dict:
+        """Pull papers indexed since the watermark (or all) and merge them by arxiv_id.
+
+        Snapshots written before indexed_at existed are rebuilt in full.
+        """
+        incremental = (not full and self.meta.get("watermark")
+                       and self.meta.get("watermark_field") == INDEXED_FIELD)
+        query = None
+        if incremental:
+            since = datetime.fromisoformat(self.meta["watermark"]) - REFRESH_OVERLAP
+            query = {"range": {INDEXED_FIELD: {"gte": since.isoformat()}}}
+
+        extractors = {name: (lambda hit, name=name: _source_value(hit.get("_source", {}), name))
+                      for name in (*STRING_COLUMNS, *FLOAT_COLUMNS)}
+        extractors["arxiv_id"] = lambda hit: hit.get("_source", {}).get("arxiv_id") or hit["_id"]
+        extractors["published"] = lambda hit: _parse_date(hit.get("_source", {}).get("published"))
+        extractors[INDEXED_FIELD] = lambda hit: _parse_date(hit.get("_source", {}).get(INDEXED_FIELD))
+        fetched = export_columns(index, [*SOURCE_FIELDS, INDEXED_FIELD], extractors, query, slices)
+        indexed = np.array(fetched.pop(INDEXED_FIELD), dtype="datetime64[ms]")
+        indexed = indexed[~np.isnat(indexed)]
+        watermark = (indexed.max().astype(datetime).replace(tzinfo=timezone.utc).isoformat()
+                     if len(indexed) else self.meta["watermark"])
+
+        fetched_ids = set(fetched["arxiv_id"])
+        if incremental:
+            # Rows that weren't re-fetched are copied as stored; changed rows move to the end
+            unchanged = np.array([i for i, arxiv_id in enumerate(self.column("arxiv_id"))
+                                  if arxiv_id not in fetched_ids], dtype=np.int64)
+            updated = len(self) - len(unchanged)
+            arrays = _concat_rows(_take_rows(self._arrays(), unchanged), _to_arrays(fetched))
+        else:
+            updated = 0
+            arrays = _to_arrays(fetched)
+        rows = len(arrays["published"])
+
+        # An incremental pull can't see deletions; find them by ID when the index has fewer papers
+        removed = 0
+        resp = es_request("GET", f"/{index}/_count", timeout=30)
+        resp.raise_for_status()
+        if resp.json()["count"] < rows:
+            live = set(export_columns(
+                index, ["arxiv_id"],
+                {"arxiv_id": lambda hit: hit.get("_source", {}).get("arxiv_id") or hit["_id"]},
+                slices=slices,
+            )["arxiv_id"])
+            kept = np.array([i for i, arxiv_id in enumerate(StringColumn(*arrays["arxiv_id"]))
+                             if arxiv_id in live], dtype=np.int64)
+            removed = rows - len(kept)
+            if removed:
+                arrays = _take_rows(arrays, kept)
+
+        if incremental and not fetched_ids and not removed:
+            self._write_meta(self.root, len(self), watermark)
+        else:
+            self._write(arrays, watermark)
+        return {"fetched": len(fetched_ids), "added": len(fetched_ids) - updated,
+                "updated": updated, "removed": removed, "rows": len(self)}
+
+    def set_coords(self, arxiv_ids, viz_x, viz_y) -> int:
+        """Overwrite viz_x/viz_y in place for the given papers; returns rows updated."""
+        row_of = {arxiv_id: i for i, arxiv_id in enumerate(self.column("arxiv_id"))}
+        rows = np.array([row_of.get(arxiv_id, -1) for arxiv_id in arxiv_ids], dtype=np.int64)
+        found = rows >= 0
+        for name, values in (("viz_x", viz_x), ("viz_y", viz_y)):
+            column = _load(self.root / f"{name}.npy", mode="r+")
+            column[rows[found]] = np.asarray(values, dtype=np.float32)[found]
+            if isinstance(column, np.memmap):
+                column.flush()
+            else:
+                np.save(self.root / f"{name}.npy", column)
+        return int(found.sum())
+
+    def sync_coords(self, index: str = DEFAULT_INDEX, slices: int = EXPORT_SLICES) -> int:
+        """Re-read viz_x/viz_y for every paper in the index."""
+        fetched = export_columns(
+            index, ["arxiv_id", *FLOAT_COLUMNS],
+            {
+                "arxiv_id": lambda hit: hit.get("_source", {}).get("arxiv_id") or hit["_id"],
+                "viz_x": lambda hit: hit.get("_source", {}).get("viz_x"),
+                "viz_y": lambda hit: hit.get("_source", {}).get("viz_y"),
+            },
+            slices=slices,
+        )
+        to_float = lambda values: [np.nan if v is None else v for v in values]  # noqa: E731
+        return self.set_coords(fetched["arxiv_id"], to_float(fetched["viz_x"]),
+                               to_float(fetched["viz_y"]))
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent.parent / ".env")
+
+    parser = argparse.ArgumentParser(description="Terra Incognita columnar paper snapshot")
+    parser.add_argument("command", choices=["sync", "stats"])
+    parser.add_argument("--dir", type=Path, default=DEFAULT_SNAPSHOT_DIR,
+                        help=f"Snapshot directory (default: {DEFAULT_SNAPSHOT_DIR})")
+    parser.add_argument("--index-name", default=DEFAULT_INDEX)
+    parser.add_argument("--full", action="store_true", help="Rebuild instead of refreshing")
+    parser.add_argument("--coords", action="store_true",
+                        help="Only refresh viz_x/viz_y for papers already in the snapshot")
+    parser.add_argument("--slices", type=int, default=EXPORT_SLICES,
+                        help=f"Parallel PIT slices (default: {EXPORT_SLICES})")
+    args = parser.parse_args()
+
+    snapshot = PaperSnapshot(args.dir)
+    if args.command == "sync":
+        if args.coords:
+            print(f"Coordinates refreshed: {snapshot.sync_coords(args.index_name, args.slices)}")
+        else:
+            result = snapshot.sync(args.index_name, args.full, args.slices)
+            print(f"Fetched {result['fetched']}: {result['added']} added, "
+                  f"{result['updated']} updated, {result['removed']} removed → {result['rows']} rows")
+
+    print(f"Snapshot:  {snapshot.root}")
+    print(f"Rows:      {len(snapshot)}")
+    print(f"Watermark: {snapshot.meta['watermark']}")
+    print(f"Synced at: {snapshot.meta['synced_at']}")
+
+
+if __name__ == "__main__":
+    main()
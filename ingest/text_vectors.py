@@ -0,0 +1,185 @@
+"""Terra Incognita incremental text vectorization for the viz pipeline.
+
+Tokenizing every paper is the slow part of fitting TF-IDF on the corpus.
+VectorCache keeps each paper's term counts on disk, keyed by arxiv_id and a
+SHA-256 of its text, so a run only tokenizes papers that are new or whose
+content changed (in chunks across worker processes for a large first build).
+TfidfModel then applies TfidfVectorizer's document-frequency filtering,
+max_features cut, smoothed idf and L2 normalization to the cached counts,
+which are cheap sparse-matrix operations.
+
+Layout of a cache directory:
+
+  index.json   {"vocabulary": [term, ...], "docs": {arxiv_id: [sha256, row]}}
+  counts.npz   CSR term counts, one row per cached document version
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+INDEX_FILE = "index.json"
+COUNTS_FILE = "counts.npz"
+TOKENIZE_CHUNK = 1000       # Documents per worker task
+STOP_WORDS = "english"
+
+_analyzer = None
+
+
+def _analyze(text: str) -> list[str]:
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = TfidfVectorizer(stop_words=STOP_WORDS).build_analyzer()
+    return _analyzer(text)
+
+
+def _tokenize_chunk(texts: list[str]) -> list[Counter]:
+    return [Counter(_analyze(text)) for text in texts]
+
+
+def tokenize(texts: list[str], workers: int = 1) -> list[Counter]:
+    """Term counts per text, split into chunks across worker processes."""
+    if workers <= 1 or len(texts) <= TOKENIZE_CHUNK:
+        return _tokenize_chunk(texts)
+    chunks = [texts[i:i + TOKENIZE_CHUNK] for i in range(0, len(texts), TOKENIZE_CHUNK)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [counts for chunk in pool.map(_tokenize_chunk, chunks) for counts in chunk]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _to_csr(counters: list[Counter], vocabulary: dict[str, int], grow: bool = True) -> sparse.csr_matrix:
+    """Build a count matrix; unseen terms get new columns when grow, else are dropped."""
+    indptr = [0]
+    indices: list[int] = []
+    data: list[int] = []
+    for counter in counters:
+        for term, count in counter.items():
+            col = vocabulary.get(term)
+            if col is None:
+                if not grow:
+                    continue
+                col = vocabulary[term] = len(vocabulary)
+            indices.append(col)
+            data.append(count)
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.array(data, dtype=np.int32), np.array(indices, dtype=np.int32), np.array(indptr)),
+        shape=(len(counters), len(vocabulary)),
+    )
+
+
+def _atomic_write(path: Path, write) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class VectorCache:
+    """Per-document term counts keyed by arxiv_id and content hash.
+
+    directory=None keeps the cache in memory only (save() does nothing).
+    """
+
+    def __init__(self, directory: str | Path | None = None):
+        self.directory = Path(directory) if directory is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.vocabulary: dict[str, int] = {}
+        self.docs: dict[str, tuple[str, int]] = {}
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.int32)
+        if self.directory is None:
+            return
+        try:
+            index = json.loads((self.directory / INDEX_FILE).read_text(encoding="utf-8"))
+            self.counts = sparse.load_npz(self.directory / COUNTS_FILE).tocsr()
+        except FileNotFoundError:
+            return
+        self.vocabulary = {term: col for col, term in enumerate(index["vocabulary"])}
+        self.docs = {arxiv_id: (digest, row) for arxiv_id, (digest, row) in index["docs"].items()}
+
+    def counts_for(self, docs: list[tuple[str, str]], workers: int = 1) -> sparse.csr_matrix:
+        """Count matrix for (arxiv_id, text) pairs, tokenizing only new or changed texts."""
+        digests = [content_hash(text) for _, text in docs]
+        stale = [i for i, ((arxiv_id, _), digest) in enumerate(zip(docs, digests))
+                 if self.docs.get(arxiv_id, ("",))[0] != digest]
+        self.hits += len(docs) - len(stale)
+        self.misses += len(stale)
+
+        if stale:
+            new_rows = _to_csr(tokenize([docs[i][1] for i in stale], workers), self.vocabulary)
+            base = self.counts.shape[0]
+            self.counts.resize((base, len(self.vocabulary)))
+            self.counts = sparse.vstack([self.counts, new_rows], format="csr")
+            for offset, i in enumerate(stale):
+                self.docs[docs[i][0]] = (digests[i], base + offset)
+
+        return self.counts[[self.docs[arxiv_id][1] for arxiv_id, _ in docs]]
+
+    def _compact(self) -> None:
+        """Drop rows of superseded document versions."""
+        live = sorted(row for _, row in self.docs.values())
+        if len(live) == self.counts.shape[0]:
+            return
+        remap = {row: new for new, row in enumerate(live)}
+        self.counts = self.counts[live]
+        self.docs = {arxiv_id: (digest, remap[row]) for arxiv_id, (digest, row) in self.docs.items()}
+
+    def save(self) -> None:
+        if self.directory is None:
+            return
+        self._compact()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.directory / COUNTS_FILE, lambda f: sparse.save_npz(f, self.counts))
+        index = {"vocabulary": list(self.vocabulary), "docs": self.docs}
+        _atomic_write(self.directory / INDEX_FILE,
+                      lambda f: f.write(json.dumps(index).encode("utf-8")))
+
+
+class TfidfModel:
+    """TfidfVectorizer-style weighting fitted on cached term counts.
+
+    min_df/max_df/max_features follow TfidfVectorizer's semantics; transform()
+    tokenizes new texts the same way and maps them onto the fitted vocabulary.
+    """
+
+    def __init__(self, max_features: int | None = None, min_df: float = 1,
+                 max_df: float = 1.0, dtype=np.float32):
+        self.max_features = max_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.dtype = dtype
+
+    def fit_transform(self, counts: sparse.csr_matrix, vocabulary: dict[str, int]) -> sparse.csr_matrix:
+        n_docs = counts.shape[0]
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        min_count = self.min_df if isinstance(self.min_df, int) else self.min_df * n_docs
+        max_count = self.max_df if isinstance(self.max_df, int) else self.max_df * n_docs
+        keep = np.flatnonzero((df >= min_count) & (df <= max_count))
+        if self.max_features is not None and len(keep) > self.max_features:
+            term_totals = np.asarray(counts.sum(axis=0)).ravel()
+            keep = keep[np.argsort(-term_totals[keep], kind="stable")[:self.max_features]]
+
+        terms = list(vocabulary)  # column order
+        keep = np.array(sorted(keep, key=lambda col: terms[col]), dtype=np.int64)
+        self.vocabulary_ = {terms[col]: i for i, col in enumerate(keep)}
+        self.idf_ = (np.log((1 + n_docs) / (1 + df[keep])) + 1).astype(self.dtype)
+        return self._weight(counts[:, keep])
+
+    def transform(self, texts: list[str]) -> sparse.csr_matrix:
+        return self._weight(_to_csr(tokenize(texts), self.vocabulary_, grow=False))
+
+    def _weight(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        tfidf = counts.astype(self.dtype) @ sparse.diags(self.idf_)
+        return normalize(sparse.csr_matrix(tfidf))
@@ -17,7 +17,12 @@ import asyncio
 import json
 import logging
 import os
+import re
+import uuid
+import xml.etree.ElementTree as ET
+import zlib
 from datetime import datetime, timezone
+from pathlib import Path
 
 import httpx
 from mcp.server.fastmcp import FastMCP
@@ -32,6 +37,23 @@ ES_API_KEY = os.environ["ES_API_KEY"]
 KIBANA_URL = os.environ.get("KIBANA_URL", "")
 CLOUD_RUN_URL = os.environ.get("CLOUD_RUN_URL", "")
 
+# Ingest checkpoint shared with ingest/arxiv_collector.py (optional).
+# Point at a persistent mount (e.g. Cloud Storage FUSE) to skip known papers.
+TI_STATE_DIR = os.environ.get("TI_STATE_DIR", "")
+
+# gzip-compress _bulk request bodies (Content-Encoding: gzip)
+ES_BULK_GZIP = os.environ.get("ES_BULK_GZIP", "").lower() in ("1", "true", "yes")
+
+# Write-behind mode for ti_save_results (optional): results are appended to a
+# write-ahead log in this directory and flushed to ES in the background.
+# The log is opened (and replayed) at startup and drained on shutdown (SIGTERM).
+# Each server process owns its log: on Cloud Run, mount a persistent volume per
+# instance and keep CPU always allocated, or the flusher stalls between requests.
+TI_WAL_DIR = os.environ.get("TI_WAL_DIR", "")
+WAL_FLUSH_SIZE = int(os.environ.get("TI_WAL_FLUSH_SIZE", "200"))          # entries per _bulk
+WAL_FLUSH_INTERVAL = float(os.environ.get("TI_WAL_FLUSH_INTERVAL", "2"))  # seconds
+WAL_MAX_ATTEMPTS = int(os.environ.get("TI_WAL_MAX_ATTEMPTS", "5"))       # rejected flushes before dead-lettering
+
 mcp = FastMCP(
     name="terra-incognita-writer",
     instructions="Terra Incognita result storage + automation server. Records Gaps, Bridges, Discovery Cards, and Exploration Logs to ES, and triggers daily exploration/monitoring via Cloud Scheduler.",
@@ -49,6 +71,12 @@ INDEX_MAP = {
     "exploration_log": "ti-exploration-log",
 }
 
+# Open gaps registered as stored queries, percolated against newly ingested papers.
+# Same layout as ingest/gap_percolator.py — keep the two in sync.
+GAP_PERCOLATOR_INDEX = "ti-gap-percolator"
+GAP_MATCH_MIN_SHOULD = "75%"     # Share of gap_concept terms a paper must contain
+PERCOLATE_BATCH = 500            # Papers per percolate request
+
 # Timestamp field name per result type
 TIMESTAMP_FIELD = {
     "gap": "detected_at",
@@ -74,6 +102,10 @@ ARXIV_DOMAINS = {
 }
 INGEST_PER_DOMAIN = 10  # Latest 10 papers per domain, ~60 total/day
 
+# arXiv Atom API: one request every 3 s for the whole process
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_RATE_LIMIT_SECONDS = 3
+
 
 _es_client: httpx.AsyncClient | None = None
 _es_lock = asyncio.Lock()
@@ -113,14 +145,14 @@ async def _reset_es_client() -> None:
             _es_client = None
 
 
-async def _index_document(index: str, document: dict) -> dict:
+async def _index_document(index: str, document: dict, doc_id: str | None = None) -> dict:
     """Index a document via ES REST API (with exponential backoff retry)."""
     last_exc: Exception | None = None
     for attempt in range(_MAX_RETRIES):
         client = await _get_es_client()
         try:
             resp = await client.post(
-                f"{ES_URL}/{index}/_doc",
+                f"{ES_URL}/{index}/_doc/{doc_id}" if doc_id else f"{ES_URL}/{index}/_doc",
                 content=json.dumps(document),
             )
             resp.raise_for_status()
@@ -145,13 +177,13 @@ async def _index_document(index: str, document: dict) -> dict:
 
 
 async def _search_es(index: str, body: dict, timeout: float = 30) -> dict:
-    """Search via ES REST API (with exponential backoff retry)."""
+    """Search via ES REST API (with exponential backoff retry). index="" searches a PIT."""
     last_exc: Exception | None = None
     for attempt in range(_MAX_RETRIES):
         client = await _get_es_client()
         try:
             resp = await client.post(
-                f"{ES_URL}/{index}/_search",
+                f"{ES_URL}/{index}/_search" if index else f"{ES_URL}/_search",
                 content=json.dumps(body),
                 timeout=timeout,
             )
@@ -207,9 +239,490 @@ async def _update_document(index: str, doc_id: str, fields: dict) -> dict:
     raise last_exc  # type: ignore[misc]
 
 
+async def _iter_bulk_body(actions: list[tuple[dict, dict]]):
+    """Stream the _bulk body one action/source pair at a time (gzip if ES_BULK_GZIP)."""
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if ES_BULK_GZIP else None
+    for action, source in actions:
+        line = (
+            json.dumps(action) + "\n"
+            + json.dumps(source, ensure_ascii=False) + "\n"
+        ).encode("utf-8")
+        chunk = gz.compress(line) if gz else line
+        if chunk:
+            yield chunk
+    if gz:
+        yield gz.flush()
+
+
+async def _post_ndjson(path: str, pairs: list[tuple[dict, dict]], timeout: float = 120) -> dict:
+    """POST an ndjson body (_bulk, _msearch) with exponential backoff retry."""
+    headers = {**_ES_HEADERS, "Content-Type": "application/x-ndjson"}
+    if ES_BULK_GZIP:
+        headers["Content-Encoding"] = "gzip"
+    last_exc: Exception | None = None
+    for attempt in range(_MAX_RETRIES):
+        client = await _get_es_client()
+        try:
+            resp = await client.post(
+                f"{ES_URL}{path}",
+                content=_iter_bulk_body(pairs),
+                headers=headers,
+                timeout=timeout,
+            )
+            resp.raise_for_status()
+            return resp.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in _RETRYABLE_STATUS and attempt < _MAX_RETRIES - 1:
+                wait = 2 ** attempt
+                logger.warning("ES %s %s, retrying in %ds", path, e.response.status_code, wait)
+                await asyncio.sleep(wait)
+                last_exc = e
+            else:
+                raise
+        except (httpx.ConnectError, httpx.ReadError) as e:
+            logger.warning("%s connection error: %s, resetting client", path, e)
+            await _reset_es_client()
+            if attempt < _MAX_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+                last_exc = e
+            else:
+                raise
+    raise last_exc  # type: ignore[misc]
+
+
+async def _bulk_write(actions: list[tuple[dict, dict]], timeout: float = 120) -> list[dict]:
+    """Send action/source pairs in one _bulk request.
+
+    Returns the per-item results from the response, in request order.
+    """
+    return (await _post_ndjson("/_bulk", actions, timeout)).get("items", [])
+
+
+async def _msearch(searches: list[tuple[dict, dict]], timeout: float = 60) -> list[dict]:
+    """Run header/body pairs in one _msearch request; one response per search, in order."""
+    return (await _post_ndjson("/_msearch", searches, timeout)).get("responses", [])
+
+
+class _WriteAheadLog:
+    """Local log of pending result writes, flushed to ES by a background task.
+
+    <TI_WAL_DIR>/results.wal     one JSON line per write: {"index", "id", "doc"}
+    <TI_WAL_DIR>/results.offset  byte offset up to which the log has been flushed
+    <TI_WAL_DIR>/results.dead    entries ES rejected, with the error (same line format)
+
+    Every entry carries its final _id, so re-sending an entry that already
+    reached ES (crash between _bulk and the offset update) overwrites it with
+    the same document. Entries past the offset are replayed when the log is
+    opened again after a restart.
+
+    A batch that ES keeps rejecting (a request-level 4xx, or items still
+    failing with a retryable status) is retried WAL_MAX_ATTEMPTS times, then
+    its failing entries go to the dead-letter file and the flush moves on.
+    Items rejected with a permanent error go there right away. ES being
+    unreachable doesn't count as an attempt; the log just waits for it.
+    """
+
+    def __init__(self, directory: str):
+        self.path = Path(directory)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.path / "results.wal"
+        self.offset_path = self.path / "results.offset"
+        self.dead_path = self.path / "results.dead"
+        self._attempts = (0, 0)  # (batch offset, rejected flushes of that batch)
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+        try:
+            self._offset = int(self.offset_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self._offset = 0
+        self._repair()
+        self._pending = len(self._read(self._offset, None)[0])
+        if self._pending:
+            logger.info("WAL: replaying %d unflushed result(s)", self._pending)
+
+    def _repair(self) -> None:
+        """Drop a torn last line left by a crash mid-append."""
+        try:
+            data = self.log_path.read_bytes()
+        except FileNotFoundError:
+            data = b""
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            with open(self.log_path, "r+b") as f:
+                f.truncate(end)
+        if self._offset > end:
+            self._save_offset(end)
+
+    def _save_offset(self, offset: int) -> None:
+        tmp = self.path / f"results.offset.{os.getpid()}.tmp"
+        tmp.write_text(str(offset), encoding="utf-8")
+        os.replace(tmp, self.offset_path)
+        self._offset = offset
+
+    def _read(self, offset: int, limit: int | None) -> tuple[list[dict], int]:
+        """Read up to limit complete entries starting at offset. Returns (entries, end offset)."""
+        entries: list[dict] = []
+        try:
+            f = open(self.log_path, "rb")
+        except FileNotFoundError:
+            return entries, offset
+        with f:
+            f.seek(offset)
+            while limit is None or len(entries) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("WAL: skipping unreadable entry at byte %d", offset - len(line))
+        return entries, offset
+
+    def _append(self, data: bytes, path: Path | None = None) -> None:
+        with open(path or self.log_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _dead_letter(self, failed: list[tuple[dict, object]]) -> None:
+        for entry, error in failed:
+            logger.error("WAL: dead-lettering %s/%s: %s", entry["index"], entry["id"], error)
+        self._append("".join(
+            json.dumps({**entry, "error": error}, ensure_ascii=False, default=str) + "\n"
+            for entry, error in failed
+        ).encode("utf-8"), self.dead_path)
+
+    def _rejected(self) -> bool:
+        """Count a rejected flush of the batch at the current offset; True once it is out of attempts."""
+        offset, attempts = self._attempts
+        attempts = attempts + 1 if offset == self._offset else 1
+        self._attempts = (self._offset, attempts)
+        return attempts >= WAL_MAX_ATTEMPTS
+
+    async def append(self, entries: list[tuple[str, str, dict]]) -> None:
+        """Durably log (index, _id, document) writes; ES sees them on the next flush."""
+        data = "".join(
+            json.dumps({"index": index, "id": doc_id, "doc": doc}, ensure_ascii=False) + "\n"
+            for index, doc_id, doc in entries
+        ).encode("utf-8")
+        async with self._lock:
+            await asyncio.to_thread(self._append, data)
+            self._pending += len(entries)
+        if self._pending >= WAL_FLUSH_SIZE:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Send logged entries to ES in _bulk batches until the log is drained."""
+        flushed = 0
+        while True:
+            entries, end = await asyncio.to_thread(self._read, self._offset, WAL_FLUSH_SIZE)
+            if not entries:
+                break
+            try:
+                items = await _bulk_write([
+                    ({"index": {"_index": e["index"], "_id": e["id"]}}, e["doc"]) for e in entries
+                ])
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in _RETRYABLE_STATUS or not self._rejected():
+                    raise
+                failed = [(entry, f"HTTP {e.response.status_code}: {e.response.text[:500]}")
+                          for entry in entries]
+            else:
+                results = [item.get("index", {}) for item in items]
+                retry = sum(1 for result in results if result.get("status") in _RETRYABLE_STATUS)
+                if retry and not self._rejected():
+                    raise RuntimeError(f"{retry} result(s) rejected with a retryable status")
+                failed = [(entry, result["error"]) for entry, result in zip(entries, results)
+                          if result.get("error")]
+            if failed:
+                await asyncio.to_thread(self._dead_letter, failed)
+            async with self._lock:
+                await asyncio.to_thread(self._save_offset, end)
+                self._pending = max(0, self._pending - len(entries))
+            flushed += len(entries)
+
+        # Everything is in ES: start the log over
+        async with self._lock:
+            if self._offset and self.log_path.stat().st_size == self._offset:
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(0)
+                self._save_offset(0)
+        return flushed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), WAL_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._pending:
+                continue
+            try:
+                flushed = await self.flush()
+                logger.info("WAL: flushed %d result(s)", flushed)
+            except Exception as e:
+                logger.warning("WAL flush failed: %s, retrying in %gs", e, WAL_FLUSH_INTERVAL)
+
+    def start(self) -> None:
+        """Run the flusher on the current event loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            if self._pending:
+                self._wake.set()  # Replay right away
+
+    async def close(self) -> None:
+        """Stop the flusher and send whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending:
+            try:
+                logger.info("WAL: flushed %d result(s) on shutdown", await self.flush())
+            except Exception as e:
+                logger.warning("WAL flush on shutdown failed, %d result(s) left for replay: %s",
+                               self._pending, e)
+
+
+_wal: _WriteAheadLog | None = None
+
+
+def _get_wal() -> _WriteAheadLog | None:
+    """The write-behind log when TI_WAL_DIR is set; opening it starts the flusher."""
+    global _wal
+    if not TI_WAL_DIR:
+        return None
+    if _wal is None:
+        _wal = _WriteAheadLog(TI_WAL_DIR)
+    _wal.start()
+    return _wal
+
+
+def _result_id(index: str, document: dict) -> str:
+    """Deterministic _id for a result, known before it is written."""
+    key = index + "\n" + json.dumps(document, sort_keys=True, ensure_ascii=False)
+    return uuid.uuid5(uuid.NAMESPACE_URL, key).hex
+
+
+# ─── Gap percolator ──────────────────────────────────────────────
+
+
+def _gap_percolator_doc(gap: dict) -> dict:
+    """Stored query matching papers that may fill a Gap (lexical; percolation can't run ELSER)."""
+    return {
+        "query": {
+            "bool": {
+                "must": [{"match": {"content": {
+                    "query": gap["gap_concept"],
+                    "minimum_should_match": GAP_MATCH_MIN_SHOULD,
+                }}}],
+                "filter": [{"term": {"domain": gap["gap_domain"]}}],
+            },
+        },
+        "gap_domain": gap["gap_domain"],
+        "status": gap.get("status") or "open",
+    }
+
+
+def _gap_query_writes(entries: list[tuple[str, str, dict]]) -> list[tuple[str, str, dict]]:
+    """Percolator registrations for the Gaps among (index, _id, document) writes."""
+    return [
+        (GAP_PERCOLATOR_INDEX, doc_id, _gap_percolator_doc(doc))
+        for index, doc_id, doc in entries
+        if index == INDEX_MAP["gap"] and doc.get("gap_concept") and doc.get("gap_domain")
+    ]
+
+
+async def _percolate_papers(papers: list[dict]) -> dict[str, list[str]]:
+    """Match papers against the stored queries of open Gaps: {gap_id: [arxiv_id, ...]}."""
+    matches: dict[str, list[str]] = {}
+    for i in range(0, len(papers), PERCOLATE_BATCH):
+        batch = papers[i:i + PERCOLATE_BATCH]
+        result = await _search_es(GAP_PERCOLATOR_INDEX, {
+            "query": {
+                "bool": {
+                    "filter": [
+                        {"term": {"status": "open"}},
+                        {"percolate": {
+                            "field": "query",
+                            "documents": [
+                                {"content": p.get("content", ""), "domain": p.get("domain")}
+                                for p in batch
+                            ],
+                        }},
+                    ],
+                },
+            },
+            "_source": False,
+            "size": 10000,
+            "track_total_hits": False,
+        }, timeout=60)
+        for hit in result.get("hits", {}).get("hits", []):
+            slots = hit.get("fields", {}).get("_percolator_document_slot", [])
+            matches.setdefault(hit["_id"], []).extend(batch[slot]["arxiv_id"] for slot in slots)
+    return matches
+
+
+async def _mark_gaps_filling(paper_counts: dict[str, int]) -> int:
+    """Move Gaps to "filling" (and their stored queries with them) in one _bulk update.
+
+    Returns the number of Gaps that failed to update.
+    """
+    watched_at = datetime.now(timezone.utc).isoformat()
+    actions = []
+    for gap_id, count in paper_counts.items():
+        actions.append(({"update": {"_index": INDEX_MAP["gap"], "_id": gap_id}}, {"doc": {
+            "status": "filling",
+            "last_watch_at": watched_at,
+            "filling_paper_count": count,
+        }}))
+        actions.append(({"update": {"_index": GAP_PERCOLATOR_INDEX, "_id": gap_id}},
+                        {"doc": {"status": "filling"}}))
+    items = await _bulk_write(actions)
+    return sum(
+        1 for item in items
+        if item.get("update", {}).get("_index") == INDEX_MAP["gap"]
+        and item["update"].get("error")
+    )
+
+
 # ─── Tool 1: ti_save_results ─────────────────────────────────────
 
 
+def _prepare_result(result_type: str, document: dict) -> tuple[str, dict] | str:
+    """Validate one result and add its timestamp. Returns (index, document) or an error message."""
+    index = INDEX_MAP.get(result_type)
+    if not index:
+        valid = ", ".join(INDEX_MAP.keys())
+        return f"Invalid result_type: {result_type}. Valid: {valid}"
+    if not isinstance(document, dict):
+        return f"Expected a JSON object for {result_type}, got {type(document).__name__}"
+
+    # Auto-add timestamp if missing
+    ts_field = TIMESTAMP_FIELD[result_type]
+    if ts_field not in document:
+        document[ts_field] = datetime.now(timezone.utc).isoformat()
+    return index, document
+
+
+def _registration_failures(registrations: list[tuple[str, str, dict]], items: list[dict]) -> list[dict]:
+    """Log and list the gap query registrations that ES rejected."""
+    failures = []
+    for (_, gap_id, _), item in zip(registrations, items):
+        outcome = item.get("index", {})
+        if outcome.get("error"):
+            logger.warning("Gap query registration failed for %s: %s", gap_id, outcome["error"])
+            failures.append({
+                "gap_id": gap_id,
+                "http_status": outcome.get("status"),
+                "message": json.dumps(outcome["error"], ensure_ascii=False)[:500],
+            })
+    return failures
+
+
+async def _save_batch(result_type: str, items: list) -> str:
+    """Write a list of results in one _bulk request and report per-item status.
+
+    Each item is a result object; in a "batch" every item names its own
+    result_type (a plain result_type applies to items that don't). IDs are
+    assigned up front, so when the batch holds exactly one gap, bridges and
+    discovery cards without a gap_id are linked to it.
+    """
+    if not items:
+        return json.dumps({"status": "error", "message": "Empty batch"}, ensure_ascii=False)
+
+    prepared: list[tuple[str, str, dict]] = []  # (result_type, index, document)
+    for i, item in enumerate(items):
+        document = dict(item) if isinstance(item, dict) else item
+        item_type = document.pop("result_type", None) if isinstance(document, dict) else None
+        item_type = item_type or (result_type if result_type != "batch" else "")
+        checked = _prepare_result(item_type, document)
+        if isinstance(checked, str):
+            return json.dumps(
+                {"status": "error", "message": f"Item {i}: {checked}"},
+                ensure_ascii=False,
+            )
+        prepared.append((item_type, *checked))
+
+    gap_ids = [_result_id(index, document)
+               for item_type, index, document in prepared if item_type == "gap"]
+    if len(gap_ids) == 1:
+        for item_type, _, document in prepared:
+            if item_type in ("bridge", "discovery_card") and not document.get("gap_id"):
+                document["gap_id"] = gap_ids[0]
+    ids = [_result_id(index, document) for _, index, document in prepared]
+
+    writes = [(index, doc_id, document) for doc_id, (_, index, document) in zip(ids, prepared)]
+    if wal := _get_wal():
+        await wal.append(writes + _gap_query_writes(writes))
+        return json.dumps(
+            {
+                "status": "ok",
+                "saved": len(ids),
+                "errors": 0,
+                "results": [
+                    {"result_type": item_type, "index": index, "id": doc_id,
+                     "status": "ok", "result": "queued"}
+                    for doc_id, (item_type, index, _) in zip(ids, prepared)
+                ],
+            },
+            ensure_ascii=False,
+        )
+
+    registrations = _gap_query_writes(writes)
+    try:
+        # Percolator registrations go last, after the per-item results
+        items_result = await _bulk_write([
+            ({"index": {"_index": index, "_id": doc_id}}, document)
+            for index, doc_id, document in writes + registrations
+        ])
+    except httpx.HTTPStatusError as e:
+        logger.error("ES bulk save failed: %s %s", e.response.status_code, e.response.text)
+        return json.dumps(
+            {
+                "status": "error",
+                "http_status": e.response.status_code,
+                "message": e.response.text[:500],
+            },
+            ensure_ascii=False,
+        )
+    except Exception as e:
+        logger.error("Unexpected error: %s", e)
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+
+    results = []
+    for (item_type, index, _), item in zip(prepared, items_result):
+        outcome = item.get("index", {})
+        entry = {"result_type": item_type, "index": index, "id": outcome.get("_id"),
+                 "http_status": outcome.get("status")}
+        if outcome.get("error"):
+            entry["status"] = "error"
+            entry["message"] = json.dumps(outcome["error"], ensure_ascii=False)[:500]
+        else:
+            entry["status"] = "ok"
+            entry["result"] = outcome.get("result")
+        results.append(entry)
+
+    errors = sum(1 for entry in results if entry["status"] == "error")
+    response = {
+        "status": "ok" if not errors else ("error" if errors == len(results) else "partial"),
+        "saved": len(results) - errors,
+        "errors": errors,
+        "results": results,
+    }
+    # A saved gap whose stored query failed still exists, but ingest won't match papers to it
+    if failures := _registration_failures(registrations, items_result[len(prepared):]):
+        response["registration_errors"] = failures
+    return json.dumps(response, ensure_ascii=False)
+
+
 @mcp.tool()
 async def ti_save_results(
     result_type: str,
@@ -218,26 +731,28 @@ async def ti_save_results(
     """Save exploration results to Elasticsearch.
 
     Stores the output of the 5-step workflow (SURVEY->DETECT->BRIDGE->VALIDATE->PROPOSE)
-    across 4 indices.
+    across 4 indices. A JSON array saves several results in a single _bulk request.
 
     Args:
-        result_type: Type of result to save. "gap" | "bridge" | "discovery_card" | "exploration_log"
+        result_type: Type of result to save. "gap" | "bridge" | "discovery_card" | "exploration_log",
+              or "batch" when data is an array of results of mixed types.
         data: JSON string. Must include the fields for each type:
               - gap: query_text, source_domain, gap_domain, innovation_vacuum_index, status, etc.
               - bridge: gap_id, bridge_text, source_domain, target_domain, serendipity_probability, etc.
               - discovery_card: gap_id, hypothesis_title, gap_summary, innovation_vacuum_index, confidence, etc.
               - exploration_log: conversation_id, action, query, gaps_found, bridges_found, etc.
+              May also be an array of such objects. With result_type "batch", each object
+              carries its own "result_type" field. If the batch contains one gap, bridges and
+              discovery cards without gap_id are linked to it. The response lists
+              per-item status, plus "registration_errors" for open gaps whose stored
+              percolator query could not be written.
+
+    With TI_WAL_DIR set, results are written to a local write-ahead log and the call
+    returns their document IDs at once ("result": "queued"); a background task
+    indexes them within TI_WAL_FLUSH_INTERVAL seconds (entries left at shutdown are
+    replayed when the server starts again).
     """
-    # 1) Validate result_type
-    index = INDEX_MAP.get(result_type)
-    if not index:
-        valid = ", ".join(INDEX_MAP.keys())
-        return json.dumps(
-            {"status": "error", "message": f"Invalid result_type: {result_type}. Valid: {valid}"},
-            ensure_ascii=False,
-        )
-
-    # 2) Parse data JSON
+    # 1) Parse data JSON
     try:
         document = json.loads(data)
     except json.JSONDecodeError as e:
@@ -246,23 +761,56 @@ async def ti_save_results(
             ensure_ascii=False,
         )
 
-    # 3) Auto-add timestamp if missing
-    ts_field = TIMESTAMP_FIELD[result_type]
-    if ts_field not in document:
-        document[ts_field] = datetime.now(timezone.utc).isoformat()
+    if isinstance(document, list):
+        return await _save_batch(result_type, document)
 
-    # 4) Index to ES
-    try:
-        result = await _index_document(index, document)
+    # 2) Validate result_type and add timestamp
+    checked = _prepare_result(result_type, document)
+    if isinstance(checked, str):
+        return json.dumps({"status": "error", "message": checked}, ensure_ascii=False)
+    index, document = checked
+
+    # 3) Write-behind mode: log locally, ES gets it on the next background flush
+    doc_id = _result_id(index, document)
+    if wal := _get_wal():
+        await wal.append([(index, doc_id, document)]
+                         + _gap_query_writes([(index, doc_id, document)]))
         return json.dumps(
-            {
-                "status": "ok",
-                "index": index,
-                "id": result.get("_id"),
-                "result": result.get("result"),
-            },
+            {"status": "ok", "index": index, "id": doc_id, "result": "queued"},
             ensure_ascii=False,
         )
+
+    # 4) Index to ES; a Gap and its stored query go in one _bulk request
+    try:
+        if registrations := _gap_query_writes([(index, doc_id, document)]):
+            items = await _bulk_write([
+                ({"index": {"_index": i, "_id": d}}, doc)
+                for i, d, doc in [(index, doc_id, document), *registrations]
+            ])
+            result = items[0].get("index", {})
+            failures = _registration_failures(registrations, items[1:])
+            if result.get("error"):
+                return json.dumps(
+                    {
+                        "status": "error",
+                        "index": index,
+                        "http_status": result.get("status"),
+                        "message": json.dumps(result["error"], ensure_ascii=False)[:500],
+                    },
+                    ensure_ascii=False,
+                )
+        else:
+            result = await _index_document(index, document, doc_id)
+            failures = []
+        response = {
+            "status": "ok",
+            "index": index,
+            "id": result.get("_id"),
+            "result": result.get("result"),
+        }
+        if failures:
+            response["registration_errors"] = failures
+        return json.dumps(response, ensure_ascii=False)
     except httpx.HTTPStatusError as e:
         logger.error("ES indexing failed: %s %s", e.response.status_code, e.response.text)
         return json.dumps(
@@ -346,40 +894,212 @@ async def ti_daily_discovery() -> str:
 
 # ─── Tool 3: ti_ingest_new (Cloud Scheduler) ─────────────────────
 
+# Same layout as ingest/ingest_state.py — keep the two in sync:
+#   <TI_STATE_DIR>/<index>/watermarks.json  {"<scope>": {"<domain>": "<published ISO>"}}
+#   <TI_STATE_DIR>/<index>/seen_ids.txt     sorted arxiv_ids, one per line
+_CHECKPOINT_SCOPE = "recent"
+
+
+def _load_checkpoint(index: str = "ti-papers") -> tuple[dict, set[str]]:
+    """Load (watermarks, known arxiv_ids) from TI_STATE_DIR. Empty when unset."""
+    if not TI_STATE_DIR:
+        return {}, set()
+    path = Path(TI_STATE_DIR) / index
+    try:
+        watermarks = json.loads((path / "watermarks.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        watermarks = {}
+    try:
+        with open(path / "seen_ids.txt", encoding="utf-8") as f:
+            known_ids = {line.rstrip("\n") for line in f if line.strip()}
+    except FileNotFoundError:
+        known_ids = set()
+    return watermarks, known_ids
+
+
+def _save_checkpoint(watermarks: dict, known_ids: set[str], index: str = "ti-papers") -> None:
+    """Merge with the on-disk checkpoint and replace it atomically."""
+    if not TI_STATE_DIR:
+        return
+    path = Path(TI_STATE_DIR) / index
+    path.mkdir(parents=True, exist_ok=True)
+
+    on_disk, disk_ids = _load_checkpoint(index)
+    for scope, domains in on_disk.items():
+        for domain, published in domains.items():
+            mine = watermarks.setdefault(scope, {}).get(domain)
+            if mine is None or datetime.fromisoformat(published) > datetime.fromisoformat(mine):
+                watermarks[scope][domain] = published
+    known_ids = known_ids | disk_ids
+
+    for name, text in (
+        ("watermarks.json", json.dumps(watermarks, indent=2, sort_keys=True) + "\n"),
+        ("seen_ids.txt", "".join(f"{arxiv_id}\n" for arxiv_id in sorted(known_ids))),
+    ):
+        tmp = path / f"{name}.{os.getpid()}.tmp"
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path / name)
+
+
+class _AsyncTokenBucket:
+    """Token bucket shared by every task on the event loop. acquire() waits for a token."""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:  # Waiters queue up in order
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity,
+                                       self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_arxiv_limiter = _AsyncTokenBucket(1 / ARXIV_RATE_LIMIT_SECONDS)
+_arxiv_client: httpx.AsyncClient | None = None
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+
+
+async def _get_arxiv_client() -> httpx.AsyncClient:
+    """Singleton AsyncClient for the arXiv API (kept apart from the ES client and its API key)."""
+    global _arxiv_client
+    if _arxiv_client is None or _arxiv_client.is_closed:
+        async with _es_lock:
+            if _arxiv_client is None or _arxiv_client.is_closed:
+                _arxiv_client = httpx.AsyncClient(
+                    timeout=60, headers={"User-Agent": "terra-incognita-mcp"},
+                )
+    return _arxiv_client
+
+
+def _parse_arxiv_entry(entry: ET.Element, domain_name: str) -> dict:
+    """Atom <entry> → ti-papers document (same fields as ingest/arxiv_collector.py)."""
+    entry_id = entry.findtext(f"{_ATOM}id", "")
+    title = re.sub(r"\s+", " ", entry.findtext(f"{_ATOM}title", "")).strip()
+    summary = entry.findtext(f"{_ATOM}summary", "").strip()
+    primary = entry.find(f"{_ARXIV_NS}primary_category")
+    return {
+        "arxiv_id": entry_id.split("/abs/")[-1].split("v")[0],
+        "title": title,
+        "abstract": summary,
+        "content": f"{title}. {summary}",
+        "primary_category": primary.get("term") if primary is not None else None,
+        "categories": [c.get("term") for c in entry.findall(f"{_ATOM}category")],
+        "domain": domain_name,
+        "published": datetime.fromisoformat(
+            entry.findtext(f"{_ATOM}published", "").replace("Z", "+00:00")
+        ).isoformat(),
+        "authors": [a.findtext(f"{_ATOM}name", "") for a in entry.findall(f"{_ATOM}author")[:10]],
+    }
+
+
+async def _fetch_arxiv_domain(
+    domain_name: str,
+    query: str,
+    max_results: int,
+    since: str | None = None,
+) -> list[dict]:
+    """Latest papers of one domain, newest first, parsed while the Atom feed streams in.
+
+    Stops reading at the watermark (newest published already indexed).
+    """
+    since_dt = datetime.fromisoformat(since) if since else None
+    params = {
+        "search_query": query,
+        "sortBy": "submittedDate",
+        "sortOrder": "descending",
+        "start": 0,
+        "max_results": max_results,
+    }
+    last_exc: Exception | None = None
+    for attempt in range(_MAX_RETRIES):
+        await _arxiv_limiter.acquire()
+        client = await _get_arxiv_client()
+        papers: list[dict] = []
+        parser = ET.XMLPullParser(events=("end",))
+        try:
+            async with client.stream("GET", ARXIV_API_URL, params=params) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.aiter_bytes():
+                    parser.feed(chunk)
+                    for _, elem in parser.read_events():
+                        if elem.tag != f"{_ATOM}entry":
+                            continue
+                        paper = _parse_arxiv_entry(elem, domain_name)
+                        elem.clear()
+                        if since_dt is not None and datetime.fromisoformat(paper["published"]) < since_dt:
+                            return papers
+                        papers.append(paper)
+            return papers
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in _RETRYABLE_STATUS and attempt < _MAX_RETRIES - 1:
+                wait = 2 ** attempt
+                logger.warning("arXiv %s for %s, retrying in %ds",
+                               e.response.status_code, domain_name, wait)
+                await asyncio.sleep(wait)
+                last_exc = e
+            else:
+                raise
+        except (httpx.ConnectError, httpx.ReadError, httpx.ReadTimeout) as e:
+            logger.warning("arXiv connection error for %s: %s", domain_name, e)
+            if attempt < _MAX_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+                last_exc = e
+            else:
+                raise
+    raise last_exc  # type: ignore[misc]
+
 
-def _collect_recent_papers(max_per_domain: int = INGEST_PER_DOMAIN) -> list[dict]:
-    """Synchronous function — called via asyncio.to_thread(). The arxiv library is sync."""
-    import arxiv
+async def _collect_recent_papers(
+    max_per_domain: int = INGEST_PER_DOMAIN,
+    watermarks: dict[str, str] | None = None,
+    known_ids: set[str] | None = None,
+) -> tuple[list[dict], dict[str, str]]:
+    """Fetch every domain concurrently; the shared limiter spaces the arXiv requests.
 
+    Stops each domain at its watermark (newest published already indexed)
+    and skips known arxiv_ids, so only the delta since the last run is fetched.
+    Returns (papers, {failed domain: error}); a failed domain contributes no
+    papers, so its watermark stays put.
+    """
+    results = await asyncio.gather(
+        *(
+            _fetch_arxiv_domain(domain_name, query, max_per_domain,
+                                (watermarks or {}).get(domain_name))
+            for domain_name, query in ARXIV_DOMAINS.items()
+        ),
+        return_exceptions=True,
+    )
+
+    # Merge in domain order: a cross-listed paper stays with the first domain
     papers: list[dict] = []
-    seen_ids: set[str] = set()
-    client = arxiv.Client(page_size=50, delay_seconds=3, num_retries=3)
-
-    for domain_name, query in ARXIV_DOMAINS.items():
-        search = arxiv.Search(
-            query=query,
-            max_results=max_per_domain,
-            sort_by=arxiv.SortCriterion.SubmittedDate,
-            sort_order=arxiv.SortOrder.Descending,
-        )
-        for result in client.results(search):
-            arxiv_id = result.entry_id.split("/abs/")[-1].split("v")[0]
-            if arxiv_id in seen_ids:
+    seen_ids: set[str] = set(known_ids or ())
+    failed: dict[str, str] = {}
+    for domain_name, result in zip(ARXIV_DOMAINS, results):
+        if isinstance(result, BaseException):
+            logger.warning("arXiv fetch failed for %s: %s", domain_name, result)
+            failed[domain_name] = str(result) or type(result).__name__
+            continue
+        for paper in result:
+            if paper["arxiv_id"] in seen_ids:
                 continue
-            seen_ids.add(arxiv_id)
-            papers.append({
-                "arxiv_id": arxiv_id,
-                "title": result.title,
-                "abstract": result.summary,
-                "content": f"{result.title}. {result.summary}",
-                "primary_category": result.primary_category,
-                "categories": result.categories,
-                "domain": domain_name,
-                "published": result.published.isoformat(),
-                "authors": [a.name for a in result.authors[:10]],
-            })
+            seen_ids.add(paper["arxiv_id"])
+            papers.append(paper)
 
-    return papers
+    return papers, failed
 
 
 @mcp.tool()
@@ -388,36 +1108,81 @@ async def ti_ingest_new() -> str:
 
     Collects up to 10 latest papers per domain across 12 domains and bulk-indexes
     them into the ti-papers index. After ELSER embedding, they are used by daily_discovery.
+    When TI_STATE_DIR is set, only papers newer than the shared ingest checkpoint
+    are fetched, and the checkpoint is advanced after indexing.
+    The new papers are then percolated against the stored queries of open Gaps
+    (ti-gap-percolator), and matched Gaps move to "filling".
+    Domains whose arXiv fetch failed are listed in failed_domains; status is
+    "partial" when some failed and "error" when all did.
     """
     try:
-        papers = await asyncio.to_thread(_collect_recent_papers, INGEST_PER_DOMAIN)
+        watermarks, known_ids = await asyncio.to_thread(_load_checkpoint)
+        papers, fetch_failures = await _collect_recent_papers(
+            INGEST_PER_DOMAIN,
+            watermarks.get(_CHECKPOINT_SCOPE, {}),
+            known_ids,
+        )
+        # Every domain failing means arXiv is unreachable, not that nothing is new
+        if len(fetch_failures) == len(ARXIV_DOMAINS):
+            return json.dumps({
+                "status": "error",
+                "message": "arXiv fetch failed for every domain",
+                "failed_domains": fetch_failures,
+            })
+        fetch_status = "partial" if fetch_failures else "ok"
         if not papers:
-            return json.dumps({"status": "ok", "indexed": 0, "message": "No new papers"})
+            return json.dumps({"status": fetch_status, "indexed": 0, "message": "No new papers",
+                               "failed_domains": fetch_failures})
+
+        # Bulk index via _bulk API (streamed body)
+        items = await _bulk_write([
+            ({"index": {"_index": "ti-papers", "_id": doc["arxiv_id"]}}, doc)
+            for doc in papers
+        ])
+        failed_ids = {
+            item["index"].get("_id")
+            for item in items
+            if item.get("index", {}).get("error")
+        }
+        errors = len(failed_ids)
+        indexed = len(papers) - errors
 
-        # Bulk index via _bulk API
-        lines: list[str] = []
+        # Advance the checkpoint: indexed IDs become known, and domains with
+        # no failures move their watermark to the newest paper fetched.
+        failed_domains = {doc["domain"] for doc in papers if doc["arxiv_id"] in failed_ids}
+        scope_marks = watermarks.setdefault(_CHECKPOINT_SCOPE, {})
         for doc in papers:
-            lines.append(json.dumps({"index": {"_index": "ti-papers", "_id": doc["arxiv_id"]}}))
-            lines.append(json.dumps(doc, ensure_ascii=False))
-        body = "\n".join(lines) + "\n"
-
-        client = await _get_es_client()
-        resp = await client.post(
-            f"{ES_URL}/_bulk",
-            content=body.encode("utf-8"),
-            headers={**_ES_HEADERS, "Content-Type": "application/x-ndjson"},
-            timeout=120,
+            if doc["domain"] in failed_domains:
+                continue
+            current = scope_marks.get(doc["domain"])
+            if current is None or datetime.fromisoformat(doc["published"]) > datetime.fromisoformat(current):
+                scope_marks[doc["domain"]] = doc["published"]
+        await asyncio.to_thread(
+            _save_checkpoint,
+            watermarks,
+            known_ids | {doc["arxiv_id"] for doc in papers if doc["arxiv_id"] not in failed_ids},
         )
-        resp.raise_for_status()
-        result = resp.json()
-        errors = sum(1 for item in result.get("items", []) if item.get("index", {}).get("error"))
-        indexed = len(papers) - errors
+
+        # Reverse gap matching: percolate only the new papers against open Gaps
+        gaps_matched = 0
+        try:
+            matches = await _percolate_papers(
+                [doc for doc in papers if doc["arxiv_id"] not in failed_ids]
+            )
+            if matches:
+                failed = await _mark_gaps_filling(
+                    {gap_id: len(set(ids)) for gap_id, ids in matches.items()}
+                )
+                gaps_matched = len(matches) - failed
+                logger.info("Ingest: %d open gap(s) matched by new papers", gaps_matched)
+        except Exception as e:
+            logger.warning("Gap percolation failed: %s", e)
 
         # Record ingest in exploration-log
         await _index_document("ti-exploration-log", {
             "action": "ingest",
             "query": "automated arXiv ingest",
-            "gaps_found": 0,
+            "gaps_found": gaps_matched,
             "domains_searched": list(ARXIV_DOMAINS.keys()),
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "papers_collected": len(papers),
@@ -426,10 +1191,12 @@ async def ti_ingest_new() -> str:
 
         logger.info("Ingest: collected %d, indexed %d, errors %d", len(papers), indexed, errors)
         return json.dumps({
-            "status": "ok",
+            "status": fetch_status,
             "total_collected": len(papers),
             "indexed": indexed,
             "errors": errors,
+            "gaps_matched": gaps_matched,
+            "failed_domains": fetch_failures,
         })
 
     except Exception as e:
@@ -439,78 +1206,135 @@ async def ti_ingest_new() -> str:
 
 # ─── Tool 4: ti_gap_watch (Cloud Scheduler) ──────────────────────
 
+GAP_WATCH_PAGE_SIZE = 1000      # Open gaps per PIT page
+GAP_WATCH_MSEARCH_BATCH = 100   # Paper searches per _msearch request
+GAP_WATCH_CONCURRENCY = 4       # _msearch requests in flight
+GAP_WATCH_PAPERS = 5            # Recent papers fetched per gap
+
+
+async def _iter_open_gaps(page_size: int = GAP_WATCH_PAGE_SIZE):
+    """Yield pages of open Gaps (IVI descending) through a point-in-time with search_after."""
+    client = await _get_es_client()
+    resp = await client.post(f"{ES_URL}/ti-gaps/_pit", params={"keep_alive": "1m"})
+    resp.raise_for_status()
+    pit_id = resp.json()["id"]
+    body = {
+        "query": {"term": {"status": "open"}},
+        "sort": [{"innovation_vacuum_index": "desc"}],
+        "_source": ["gap_concept", "gap_domain", "innovation_vacuum_index"],
+        "size": page_size,
+        "track_total_hits": False,
+    }
+    try:
+        while True:
+            body["pit"] = {"id": pit_id, "keep_alive": "1m"}
+            result = await _search_es("", body)
+            hits = result.get("hits", {}).get("hits", [])
+            if not hits:
+                return
+            yield hits
+            pit_id = result.get("pit_id", pit_id)
+            body["search_after"] = hits[-1]["sort"]
+    finally:
+        try:
+            client = await _get_es_client()
+            await client.request("DELETE", f"{ES_URL}/_pit", content=json.dumps({"id": pit_id}))
+        except Exception as e:
+            logger.warning("Closing gap watch PIT failed: %s", e)
+
+
+def _recent_papers_search(gap_concept: str, gap_domain: str) -> tuple[dict, dict]:
+    """_msearch header/body for papers from the last 7 days matching a Gap."""
+    return {"index": "ti-papers"}, {
+        "query": {
+            "bool": {
+                "must": [
+                    {"match": {"content": gap_concept}},
+                    {"term": {"domain": gap_domain}},
+                ],
+                "filter": [
+                    {"range": {"published": {"gte": "now-7d"}}},
+                ],
+            },
+        },
+        "_source": ["title"],
+        "size": GAP_WATCH_PAPERS,
+        "track_total_hits": False,
+    }
+
 
 @mcp.tool()
 async def ti_gap_watch() -> str:
     """Called daily by Cloud Scheduler. Checks recent papers in open Gap domains.
 
     Operates via direct ES queries without agent LLM inference.
-    Retrieves open Gaps and searches for papers from the last 7 days in each Gap domain.
-    Generates alerts when new papers are found.
+    Pages through all open Gaps and searches for papers from the last 7 days in
+    each Gap domain, GAP_WATCH_MSEARCH_BATCH Gaps per _msearch request.
+    Generates alerts when new papers are found and moves those Gaps to "filling"
+    in a single _bulk update.
     """
     try:
-        # Step 1: Query open Gaps (IVI descending, top 10)
-        gaps_result = await _search_es("ti-gaps", {
-            "query": {"term": {"status": "open"}},
-            "sort": [{"innovation_vacuum_index": "desc"}],
-            "size": 10,
-        })
-        gaps = gaps_result.get("hits", {}).get("hits", [])
+        # Step 1: Query open Gaps (IVI descending, all pages)
+        gaps = []
+        async for page in _iter_open_gaps():
+            gaps.extend(
+                gap for gap in page
+                if gap["_source"].get("gap_concept") and gap["_source"].get("gap_domain")
+            )
         logger.info("Gap Watch: found %d open gaps", len(gaps))
 
-        alerts = []
-        for gap in gaps:
-            src = gap["_source"]
-            gap_concept = src.get("gap_concept", "")
-            gap_domain = src.get("gap_domain", "")
+        # Step 2: Search for papers from the last 7 days in each Gap domain
+        semaphore = asyncio.Semaphore(GAP_WATCH_CONCURRENCY)
 
-            if not gap_concept or not gap_domain:
-                continue
+        async def search_batch(batch: list[dict]) -> list[dict]:
+            async with semaphore:
+                return await _msearch([
+                    _recent_papers_search(g["_source"]["gap_concept"], g["_source"]["gap_domain"])
+                    for g in batch
+                ])
 
-            # Step 2: Search for papers from the last 7 days in each Gap domain
-            papers_result = await _search_es("ti-papers", {
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"match": {"content": gap_concept}},
-                            {"term": {"domain": gap_domain}},
-                        ],
-                        "filter": [
-                            {"range": {"published": {"gte": "now-7d"}}},
-                        ],
-                    },
-                },
-                "size": 5,
-            })
-            new_papers = papers_result.get("hits", {}).get("hits", [])
+        batches = [gaps[i:i + GAP_WATCH_MSEARCH_BATCH]
+                   for i in range(0, len(gaps), GAP_WATCH_MSEARCH_BATCH)]
+        responses = [r for rs in await asyncio.gather(*map(search_batch, batches)) for r in rs]
 
+        alerts = []
+        search_errors = 0
+        for gap, response in zip(gaps, responses):
+            if "error" in response:
+                search_errors += 1
+                logger.warning("Gap Watch search failed for %s: %s", gap["_id"], response["error"])
+                continue
+            new_papers = response.get("hits", {}).get("hits", [])
             if new_papers:
+                src = gap["_source"]
                 alerts.append({
                     "gap_id": gap["_id"],
-                    "gap_concept": gap_concept,
-                    "gap_domain": gap_domain,
+                    "gap_concept": src["gap_concept"],
+                    "gap_domain": src["gap_domain"],
                     "ivi": src.get("innovation_vacuum_index"),
                     "new_paper_count": len(new_papers),
                     "new_papers": [p["_source"].get("title", "untitled") for p in new_papers[:3]],
                 })
 
-                # Auto-update Gap status: open → filling
-                try:
-                    await _update_document("ti-gaps", gap["_id"], {
-                        "status": "filling",
-                        "last_watch_at": datetime.now(timezone.utc).isoformat(),
-                        "filling_paper_count": len(new_papers),
-                    })
-                    logger.info("Gap %s status updated to 'filling'", gap["_id"])
-                except Exception as e:
-                    logger.warning("Gap status update failed for %s: %s", gap["_id"], e)
+        # Auto-update Gap status: open → filling (one _bulk request)
+        update_errors = 0
+        if alerts:
+            try:
+                update_errors = await _mark_gaps_filling(
+                    {alert["gap_id"]: alert["new_paper_count"] for alert in alerts}
+                )
+                logger.info("Gap Watch: %d gap(s) updated to 'filling'",
+                            len(alerts) - update_errors)
+            except Exception as e:
+                update_errors = len(alerts)
+                logger.warning("Gap status update failed: %s", e)
 
         # Step 3: Record results in exploration-log
         log_doc = {
             "action": "gap_watch",
             "query": "automated gap watch",
             "gaps_found": len(alerts),
-            "domains_searched": [g["_source"].get("gap_domain", "") for g in gaps],
+            "domains_searched": list(dict.fromkeys(g["_source"]["gap_domain"] for g in gaps)),
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
         await _index_document("ti-exploration-log", log_doc)
@@ -522,6 +1346,8 @@ async def ti_gap_watch() -> str:
             "status": "ok",
             "monitored_gaps": len(gaps),
             "alerts": alerts,
+            "search_errors": search_errors,
+            "update_errors": update_errors,
             "message": message,
         }, ensure_ascii=False)
 
@@ -530,5 +1356,36 @@ async def ti_gap_watch() -> str:
         return json.dumps({"status": "error", "message": str(e)})
 
 
+async def _serve_with_wal() -> None:
+    """Streamable HTTP server that opens the write-behind log for its whole lifetime."""
+    from contextlib import asynccontextmanager
+
+    import uvicorn
+
+    app = mcp.streamable_http_app()
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        wal = _get_wal()  # Replays entries left over from the previous run
+        try:
+            async with mcp_lifespan(app):
+                yield
+        finally:
+            await wal.close()
+
+    app.router.lifespan_context = lifespan
+    config = uvicorn.Config(
+        app,
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+    )
+    await uvicorn.Server(config).serve()
+
+
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
+    if TI_WAL_DIR:
+        asyncio.run(_serve_with_wal())
+    else:
+        mcp.run(transport="streamable-http")
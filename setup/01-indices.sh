@@ -37,22 +37,50 @@ create_index() {
   fi
 }
 
+# ti-papers stamps indexed_at through its default pipeline (paper_snapshot.py
+# syncs on it). Existing indexes get the field and pipeline added in place.
+create_papers_pipeline() {
+  echo -n "Creating ingest pipeline: ti-papers-indexed-at ... "
+  local http_code
+  http_code=$(curl -s -o /dev/null -w "%{http_code}" -X PUT "${ES_URL}/_ingest/pipeline/ti-papers-indexed-at" \
+    -H "Content-Type: application/json" \
+    -H "Authorization: ApiKey ${ES_API_KEY}" \
+    -d @"${INDICES_DIR}/papers-pipeline.json")
+  echo "$http_code"
+  [ "$http_code" -ge 200 ] && [ "$http_code" -lt 300 ]
+}
+
+update_papers_index() {
+  curl -s -o /dev/null -X PUT "${ES_URL}/ti-papers/_mapping" \
+    -H "Content-Type: application/json" \
+    -H "Authorization: ApiKey ${ES_API_KEY}" \
+    -d '{"properties": {"indexed_at": {"type": "date"}}}'
+  curl -s -o /dev/null -X PUT "${ES_URL}/ti-papers/_settings" \
+    -H "Content-Type: application/json" \
+    -H "Authorization: ApiKey ${ES_API_KEY}" \
+    -d '{"index.default_pipeline": "ti-papers-indexed-at"}'
+}
+
 echo "=== Terra Incognita Index Setup ==="
 echo "ES_URL: ${ES_URL}"
 echo ""
 
 ERRORS=0
 
+create_papers_pipeline                                                    || ((ERRORS++))
 create_index "ti-papers"           "${INDICES_DIR}/papers.json"           || ((ERRORS++))
+update_papers_index
 create_index "ti-gaps"             "${INDICES_DIR}/gaps.json"             || ((ERRORS++))
 create_index "ti-bridges"          "${INDICES_DIR}/bridges.json"          || ((ERRORS++))
 create_index "ti-exploration-log"  "${INDICES_DIR}/exploration-log.json"  || ((ERRORS++))
 create_index "ti-discovery-cards"  "${INDICES_DIR}/discovery-cards.json"  || ((ERRORS++))
+create_index "ti-landscape-grid"   "${INDICES_DIR}/landscape-grid.json"   || ((ERRORS++))
+create_index "ti-gap-percolator"   "${INDICES_DIR}/gap-percolator.json"   || ((ERRORS++))
 
 echo ""
 if [ "$ERRORS" -gt 0 ]; then
   echo "Completed with ${ERRORS} error(s)."
   exit 1
 else
-  echo "All 5 indices created successfully."
+  echo "All 7 indices created successfully."
 fi
@@ -104,7 +104,7 @@ TOOL_JSON=$(cat <<EOF
 {
   "id": "ti-save-results",
   "type": "mcp",
-  "description": "Saves exploration results to Elasticsearch. result_type: gap | bridge | discovery_card | exploration_log. data: JSON string with type-specific fields. Used when the user requests to save results.",
+  "description": "Saves exploration results to Elasticsearch. result_type: gap | bridge | discovery_card | exploration_log. data: JSON string with type-specific fields, or a JSON array to save several results in one request (result_type=batch lets each item set its own result_type; a single gap in the batch is linked to its bridges and discovery card). Used when the user requests to save results.",
   "tags": ["terra-incognita", "save"],
   "configuration": {
     "connector_id": "${CONNECTOR_ID}",